@@ -0,0 +1,160 @@
+# !/.venv/Scripts python3
+# -*- coding: utf-8 -*-
+
+"""
+This python module writes logs as JSON lines from a background thread,
+so the threads producing logs never wait for formatting or disk I/O.
+
++------------------+-----------+
+| Author           : Imyuru_   |
+| Version          : 0.2       |
+| Last update time : 2025-6-18 |
++------------------+-----------+
+
+Log files are rotated by size and age, rotated files are gzip compressed
+and only the newest `backup_count` of them are kept.
+
+Update Features:
+ - `after_fork` restarts the writer in a forked worker process.
+"""
+
+__version__ = 0.2
+
+import os, sys, time, json
+import gzip
+import shutil
+import atexit
+import queue
+import threading
+from datetime import datetime
+
+
+class LogSink:
+    def __init__(self, path:str|None = None, max_bytes:int = 10 * 1024**2, max_age:float = 24 * 3600,
+                 backup_count:int = 10, max_batch:int = 1000, flush_interval:float = 0.5):
+        """
+        Args:
+            path: JSONL file to write, None to only feed the listeners
+            max_bytes: rotate once the file is bigger than this
+            max_age: rotate once the file is older than this (seconds)
+            backup_count: compressed files kept after rotation
+            max_batch: max records written at once
+            flush_interval: max seconds a record waits in the queue
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.backup_count = backup_count
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.listeners = []
+        self.dropped = 0
+
+        self._queue = queue.SimpleQueue()
+        self._stop = threading.Event()
+        self._file = None
+        self._opened_at = 0.0
+        self._thread = threading.Thread(target=self._run, name='log-sink', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def add_listener(self, listener) -> None:
+        """`listener(records)` is called from the writer thread with every batch"""
+        self.listeners.append(listener)
+
+    def emit(self, level:str, message:str, **fields) -> None:
+        """Queue one record, never blocks"""
+        self._queue.put({'ts': time.time(), 'level': level, 'msg': message, **fields})
+
+    def after_fork(self, path:str|None = None) -> None:
+        """Call first thing in a forked child, threads don't survive fork.
+
+        Records queued by the parent are dropped, the child writes to `path`
+        when given (workers sharing a file would rotate it under each other).
+        """
+        if path is not None:
+            self.path = path
+        self._queue = queue.SimpleQueue()
+        self._stop = threading.Event()
+        self._file = None
+        self._thread = threading.Thread(target=self._run, name='log-sink', daemon=True)
+        self._thread.start()
+
+    def close(self) -> None:
+        """Write the queued records and stop the writer thread"""
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        self._thread.join(timeout=5)
+
+    def _take_batch(self) -> list[dict]:
+        try:
+            batch = [self._queue.get(timeout=self.flush_interval)]
+        except queue.Empty:
+            return []
+        while len(batch) < self.max_batch:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while not (self._stop.is_set() and self._queue.empty()):
+            batch = self._take_batch()
+            if not batch:
+                continue
+            for listener in self.listeners:
+                try:
+                    listener(batch)
+                except Exception as e:
+                    print(f"Log listener failed: {str(e)}", file=sys.stderr)
+            if self.path is not None:
+                try:
+                    self._write(batch)
+                except OSError as e:
+                    self.dropped += len(batch)
+                    print(f"Log write failed: {str(e)}", file=sys.stderr)
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _write(self, batch:list[dict]) -> None:
+        if self._file is not None and self._should_rotate():
+            self._rotate()
+        if self._file is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._file = open(self.path, 'a', encoding='utf-8')
+            self._opened_at = time.time()
+
+        lines = []
+        for record in batch:
+            record['time'] = datetime.fromtimestamp(record['ts']).isoformat(timespec='milliseconds')
+            lines.append(json.dumps(record, ensure_ascii=False, default=str))
+        self._file.write('\n'.join(lines) + '\n')
+        self._file.flush()
+
+    def _should_rotate(self) -> bool:
+        return self._file.tell() >= self.max_bytes or time.time() - self._opened_at >= self.max_age
+
+    def _rotate(self) -> None:
+        self._file.close()
+        self._file = None
+
+        base, ext = os.path.splitext(self.path)
+        stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+        rotated, n = f"{base}.{stamp}{ext}", 1
+        while os.path.exists(f"{rotated}.gz"):
+            rotated, n = f"{base}.{stamp}-{n}{ext}", n + 1
+        os.replace(self.path, rotated)
+        with open(rotated, 'rb') as src, gzip.open(f"{rotated}.gz", 'wb') as dst:
+            shutil.copyfileobj(src, dst)
+        os.remove(rotated)
+
+        # Keep the newest backups only
+        folder = os.path.dirname(os.path.abspath(self.path))
+        prefix = f"{os.path.basename(base)}."
+        backups = sorted(name for name in os.listdir(folder)
+                         if name.startswith(prefix) and name.endswith(f"{ext}.gz"))
+        for name in backups[:-self.backup_count] if self.backup_count > 0 else backups:
+            os.remove(os.path.join(folder, name))
@@ -6,35 +6,55 @@ This python module used to output logs in a given format that is eazy to differe
 
 +------------------+-----------+
 | Author           : Imyuru_   |
-| Version          : 0.3       |
-| Last update time : 2025-3-9  |
+| Version          : 0.5       |
+| Last update time : 2025-6-14 |
 +------------------+-----------+
 
+Update Features:
+ - System info libraries are imported lazily, system info can be collected in background.
+ - Log methods accept several messages like UiLog.
+ - Logs are printed (and written to a JSONL file) by a LogSink thread, never by the caller.
 """
 
-__version__ = 0.3
+__version__ = 0.5
 
-import os, datetime, platform
+import os, sys, datetime, platform
+import threading
 import colorama
 from colorama import Fore, Back, Style
-import psutil
-import cpuinfo
-import GPUtil
-from prettytable import PrettyTable
+
+from LogSink import LogSink
 
 
 colorama.init(autoreset=True)
 os.system("")
 
 
+LEVEL_FORMATS = {
+    'info' : f"{Fore.YELLOW}[INFO]  {Fore.RESET}",
+    'error' : f"{Fore.RED}[ERROR] {Fore.RESET}",
+    'false' : f"{Fore.LIGHTRED_EX}[FALSE] {Fore.RESET}",
+    'debug' : f"{Fore.MAGENTA}[DEBUG] {Fore.RESET}",
+}
+
+
 class Info:
-    def __init__(self):
+    def __init__(self, clear:bool = True, sys_info_background:bool = False, full_sys_info:bool = True,
+                 sink:LogSink|None = None):
         self.info_count = 0
         self.error_count = 0
         self.false_count = 0
         self.debug_count = 0
-        self.clear_screen()
-        self.get_system_info()
+        # Printing happens in the sink thread
+        self.sink = sink if sink is not None else LogSink()
+        self.sink.add_listener(self._print_records)
+        if clear:
+            self.clear_screen()
+        if sys_info_background:
+            # cpuinfo alone can take a second, don't block the startup
+            threading.Thread(target=self.get_system_info, args=(full_sys_info,), name='sys-info', daemon=True).start()
+        else:
+            self.get_system_info(full_sys_info)
     
     def clear_screen(self):
         # Check OS types
@@ -43,16 +63,32 @@ class Info:
         else:  # macOS & Linux
             os.system('clear')
     
-    def get_time(self):
-        time = str(datetime.datetime.now()).split(" ")[1].split(".")[0]
+    def get_time(self, timestamp:float|None = None):
+        now = datetime.datetime.now() if timestamp is None else datetime.datetime.fromtimestamp(timestamp)
+        time = str(now).split(" ")[1].split(".")[0]
         return f"[{time}]"
     
-    def get_system_info(self):
+    def _print_records(self, records:list[dict]):
+        sys.stdout.write(''.join(
+            f"{Style.DIM}{self.get_time(record['ts'])}{Style.RESET_ALL}{LEVEL_FORMATS[record['level']]}{record['msg']}\n"
+            for record in records
+        ))
+        sys.stdout.flush()
+    
+    def get_system_info(self, full:bool = True):
+        """Print the system info table, `full=False` skips cpuinfo and GPUtil"""
+        import psutil
+        from prettytable import PrettyTable
+        
         # Get OS info
         os_info = platform.uname()
         
         # Get CPU info
-        cpu_modle = cpuinfo.get_cpu_info()["brand_raw"]
+        if full:
+            import cpuinfo
+            cpu_modle = cpuinfo.get_cpu_info()["brand_raw"]
+        else:
+            cpu_modle = platform.processor() or os_info.machine
 
         # Get GPU info
         cpu_count = psutil.cpu_count(logical=False)
@@ -61,7 +97,13 @@ class Info:
         memory = psutil.virtual_memory()
 
         # Get GPU list
-        gpus = GPUtil.getGPUs()
+        gpus = []
+        if full:
+            try:
+                import GPUtil
+                gpus = GPUtil.getGPUs()
+            except Exception:
+                pass
         
         table = PrettyTable(["1","2"])
         table.add_row(["System info",f"{os_info.system} {os_info.release}"])
@@ -76,18 +118,22 @@ class Info:
         
         print(table)
     
-    def info(self, text:str):
-        print(f"{Style.DIM}{self.get_time()}{Style.RESET_ALL}{Fore.YELLOW}[INFO]  {Fore.RESET}{text}")
-        self.info_count += 1
+    def info(self, *texts, if_linkify=True, **fields):
+        for text in texts:
+            self.sink.emit('info', str(text), **fields)
+            self.info_count += 1
     
-    def error(self, text:str):
-        print(f"{Style.DIM}{self.get_time()}{Style.RESET_ALL}{Fore.RED}[ERROR] {Fore.RESET}{text}")
-        self.info_count += 1
+    def error(self, *texts, if_linkify=True, **fields):
+        for text in texts:
+            self.sink.emit('error', str(text), **fields)
+            self.error_count += 1
     
-    def false(self, text:str):
-        print(f"{Style.DIM}{self.get_time()}{Style.RESET_ALL}{Fore.LIGHTRED_EX}[FALSE] {Fore.RESET}{text}")
-        self.info_count += 1
+    def false(self, *texts, if_linkify=True, **fields):
+        for text in texts:
+            self.sink.emit('false', str(text), **fields)
+            self.false_count += 1
     
-    def debug(self, text:str):
-        print(f"{Style.DIM}{self.get_time()}{Style.RESET_ALL}{Fore.MAGENTA}[DEBUG] {Fore.RESET}{text}")
-        self.info_count += 1
\ No newline at end of file
+    def debug(self, *texts, if_linkify=True, **fields):
+        for text in texts:
+            self.sink.emit('debug', str(text), **fields)
+            self.debug_count += 1
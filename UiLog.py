@@ -2,48 +2,56 @@
 # -*- coding: utf-8 -*-
 
 
-__version__ = '0.4.0'
+__version__ = '0.4.5'
 
 """
 +------------------+------------+
 | Author           | Imyuru_    |
-| Version          | 0.4.0      |
-| Last update time | 2025-3-29  |
+| Version          | 0.4.5      |
+| Last update time | 2025-6-14  |
 +------------------+------------+
 
 Update Features:
  - rebuild the app with PyQt5 from tkinter.
  - 增加可操控的链接识别并转化为超链接
+ - System info is collected in background with lazily imported libraries.
+ - Event driven log consumer, logs are formatted and emitted in batches.
+ - Bounded ring buffer log model shown by a virtualized list view.
+ - Indexed log store with `filter`, `grep` and `since` commands.
+ - Logs can also be written to a JSONL file through a LogSink.
 """
 
 
 import os
 import sys
 import re
+import time
+import threading
+from bisect import bisect_left
+from collections import deque
+from heapq import merge
 from html import escape
 from urllib.parse import urlparse
 
 os.environ["PYTHONIOENCODING"] = "utf-8"
 
-import numpy as np
-
 
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget,
                              QVBoxLayout, QHBoxLayout, QLabel, 
-                             QTextBrowser, QLineEdit, QSizePolicy,
-                             QSystemTrayIcon, QMenu)
-from PyQt5.QtGui import QTextCursor
+                             QListView, QLineEdit, QSizePolicy,
+                             QSystemTrayIcon, QMenu, QStyle,
+                             QStyledItemDelegate, QAbstractItemView)
+from PyQt5.QtGui import (QTextDocument, QFont, QFontMetrics,
+                         QColor, QDesktopServices)
 from PyQt5.QtCore import (QThread, pyqtSignal, pyqtSlot,
-                          QMutex, Qt, QEasingCurve,
-                          QEvent, QPropertyAnimation, pyqtProperty)
+                          QMutex, QWaitCondition, Qt, QEasingCurve,
+                          QEvent, QPropertyAnimation, pyqtProperty,
+                          QAbstractListModel, QModelIndex, QRectF,
+                          QSize, QUrl)
 from PyQt5.QtGui import QIcon, QPixmap
 
 import platform
-import psutil
-import cpuinfo
-import GPUtil
-from prettytable import PrettyTable
-from datetime import datetime
+from datetime import datetime, time as dt_time
 
 # Check OS type
 if os.name == 'nt':  # Windows
@@ -56,19 +64,274 @@ CONFIG = {
     'app_name' : 'LoggerApp',
     'window_size' : (1280, 720),
     'font_family' : 'Consolas',
-    'font_size' : 10
+    'font_size' : 10,
+    'max_lines' : 10000,  # Lines kept by the log view, the oldest are dropped
+    'max_records' : 500000,  # Records kept by the searchable log store
+    'max_batch' : 500,  # Max logs formatted into one batch
+    'stats_fps' : 10    # Max stats label updates per second
+}
+
+COLOR_MAP = {
+    'info' : '#C0C000',
+    'error' : '#C03030',
+    'false' : '#C00000',
+    'debug' : '#C000C0',
+    'input' : '#202020',
+    'timestamp' : '#858585',
+    'content' : '#000000'
 }
 
+# Precompile regular expressions
+_IP_PATTERN = re.compile(r'\b(?:\d{1,3}\.){3}\d{1,3}(?::\d+)?\b')  # Handle URLs with ports (e.g. 192.168.1.1:8080)
+_URL_PATTERN = re.compile(
+    r'(?:https?|ftp)://[^\s,]+|'  # Match URLs with protocols
+    r'\b(?:[a-zA-Z0-9-]+\.)+[a-zA-Z]{2,}(?::\d+)?(?:/[^\s,]+)?\b'  # Match pure domain names with ports and paths (e.g. google.com:8080/path)
+)
+
+
+def _replace_url(match):
+    url = match.group(0)
+    parsed = urlparse(url)
+    if not parsed.scheme:  # Auto-complete the protocol header
+        url = f'http://{url}'
+    return f'<a href="{url}">{escape(match.group(0))}</a>'
+
+def _replace_ip(match):
+    ip = match.group(0)
+    return f'<a href="http://{ip}">{escape(ip)}</a>'
+
+def linkify_text(text: str) -> str:
+    """将文本中的 IP 和 URL 转换为超链接"""
+    # Process URLs first, then IPs (Avoid duplicate replacements)
+    text = _URL_PATTERN.sub(_replace_url, text)
+    text = _IP_PATTERN.sub(_replace_ip, text)
+    return text
+
+def format_log(log_type: str, message: str, if_linkify: bool, created: float) -> str:
+    """Render one log line into the html of a log view row"""
+    timestamp = datetime.fromtimestamp(created).strftime("[%H:%M:%S]")
+    log_label = f"[{log_type.upper()}]&nbsp;" if log_type == "info" else "&nbsp;&nbsp;>>>&nbsp;&nbsp;" if log_type == "input" else f"[{log_type.upper()}]"
+
+    # Process urls in the message
+    processed_msg = linkify_text(escape(message)) if if_linkify else message
+
+    return (f'<span style="color: {COLOR_MAP["timestamp"]}">{timestamp}</span> '
+            f'<span style="color: {COLOR_MAP[log_type]}">{log_label}</span> '
+            f'<span style="color: {COLOR_MAP["content"]}">{processed_msg}</span>')
+
+
+class RingBuffer:
+    """Fixed capacity buffer, appending over the capacity drops the oldest items"""
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.items = [None] * capacity
+        self.start = 0
+        self.count = 0
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __getitem__(self, i: int):
+        if not 0 <= i < self.count:
+            raise IndexError(i)
+        return self.items[(self.start + i) % self.capacity]
+
+    def append(self, item) -> bool:
+        """Returns True when the oldest item was dropped"""
+        self.items[(self.start + self.count) % self.capacity] = item
+        if self.count < self.capacity:
+            self.count += 1
+            return False
+        self.start = (self.start + 1) % self.capacity
+        return True
+
+    def clear(self) -> None:
+        self.reset([])
+
+    def reset(self, items: list) -> None:
+        """Replace the content with the last `capacity` items"""
+        items = items[-self.capacity:]
+        self.items = items + [None] * (self.capacity - len(items))
+        self.start = 0
+        self.count = len(items)
+
+
+class LogListModel(QAbstractListModel):
+    """Log rows (log_type, created, message, html) kept in a ring buffer"""
+    def __init__(self, max_lines: int, parent=None):
+        super().__init__(parent)
+        self.rows = RingBuffer(max_lines)
+
+    def rowCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.rows)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == Qt.DisplayRole:
+            return self.rows[index.row()][3]
+        if role == Qt.ToolTipRole:
+            return self.rows[index.row()][2]
+        return None
+
+    def append_rows(self, rows: list) -> None:
+        if not rows:
+            return
+        rows = rows[-self.rows.capacity:]
+        dropped = max(0, len(self.rows) + len(rows) - self.rows.capacity)
+        if dropped:
+            self.beginRemoveRows(QModelIndex(), 0, dropped - 1)
+            self.rows.start = (self.rows.start + dropped) % self.rows.capacity
+            self.rows.count -= dropped
+            self.endRemoveRows()
+        first = len(self.rows)
+        self.beginInsertRows(QModelIndex(), first, first + len(rows) - 1)
+        for row in rows:
+            self.rows.append(row)
+        self.endInsertRows()
+
+    def reset_rows(self, rows: list) -> None:
+        self.beginResetModel()
+        self.rows.reset(rows)
+        self.endResetModel()
+
+
+class LogStore:
+    """Every log record (log_type, created, message, html) with search indexes.
+    
+    Records get increasing ids, the store keeps per-level and per-path
+    (`calling /path` of the access logs) id lists, so a query only walks
+    the ids it can match. Times are searched by bisection.
+    """
+    PATH_PATTERN = re.compile(r'calling (/\S*)')
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.base = 0  # id of records[0]
+        self.records = []
+        self.created = []
+        self.by_level: dict[str, list[int]] = {}
+        self.by_path: dict[str, list[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def add(self, rows: list) -> None:
+        for row in rows:
+            record_id = self.base + len(self.records)
+            self.records.append(row)
+            self.created.append(row[1])
+            self.by_level.setdefault(row[0], []).append(record_id)
+            match = self.PATH_PATTERN.search(row[2])
+            if match:
+                self.by_path.setdefault(match.group(1), []).append(record_id)
+        # Trim in chunks so the cost is amortized
+        if len(self.records) > self.capacity * 1.1:
+            self._trim(len(self.records) - self.capacity)
+
+    def _trim(self, count: int) -> None:
+        del self.records[:count]
+        del self.created[:count]
+        self.base += count
+        for index in (self.by_level, self.by_path):
+            for key in list(index):
+                ids = index[key]
+                del ids[:bisect_left(ids, self.base)]
+                if not ids:
+                    del index[key]
+
+    @staticmethod
+    def matches(row: tuple, levels: set|None = None, text: str|None = None, since: float|None = None) -> bool:
+        return ((not levels or row[0] in levels)
+                and (since is None or row[1] >= since)
+                and (not text or text in row[2]))
+
+    def query(self, levels: set|None = None, text: str|None = None,
+              since: float|None = None, limit: int|None = None) -> list:
+        """Newest `limit` records matching all the given filters, oldest first.
+        
+        The smallest usable index (levels, or paths containing a `/path`
+        text) drives the walk from the newest record backwards, the other
+        filters are checked per record, so the walk stops at `limit`.
+        """
+        drivers = []
+        if levels:
+            drivers.append([self.by_level.get(level, []) for level in levels])
+        if text and text.startswith('/'):
+            drivers.append([ids for path, ids in self.by_path.items() if text in path])
+        
+        start = bisect_left(self.created, since) if since is not None else 0
+        if drivers:
+            id_lists = min(drivers, key=lambda lists: sum(map(len, lists)))
+            first_id = self.base + start
+            candidates = (self.records[record_id - self.base]
+                          for record_id in merge(*[reversed(ids) for ids in id_lists], reverse=True)
+                          if record_id >= first_id)
+        else:
+            candidates = reversed(self.records[start:])
+        
+        result = []
+        for row in candidates:
+            if self.matches(row, levels, text):
+                result.append(row)
+                if limit is not None and len(result) >= limit:
+                    break
+        result.reverse()
+        return result
+
+
+class LogItemDelegate(QStyledItemDelegate):
+    """Paint one html log row per line, only the visible rows are ever painted"""
+    def __init__(self, font: QFont, parent=None):
+        super().__init__(parent)
+        self.doc = QTextDocument()
+        self.doc.setDefaultFont(font)
+        self.doc.setDocumentMargin(2)
+        self.doc.setDefaultStyleSheet("a { color: #000000; text-decoration: none; }")
+        self.row_height = int(QFontMetrics(font).height() * 1.4) + 2
+
+    def _layout(self, html: str, width: int) -> QTextDocument:
+        self.doc.setHtml(html)
+        self.doc.setTextWidth(width)
+        return self.doc
+
+    def paint(self, painter, option, index):
+        painter.save()
+        if option.state & QStyle.State_Selected:
+            painter.fillRect(option.rect, option.palette.highlight())
+        doc = self._layout(index.data(Qt.DisplayRole), option.rect.width())
+        painter.translate(option.rect.topLeft())
+        painter.setClipRect(QRectF(0, 0, option.rect.width(), self.row_height))
+        doc.drawContents(painter, QRectF(0, 0, option.rect.width(), self.row_height))
+        painter.setPen(QColor('#101010'))
+        painter.drawLine(0, self.row_height - 1, option.rect.width(), self.row_height - 1)
+        painter.restore()
+
+    def sizeHint(self, option, index):
+        return QSize(option.rect.width(), self.row_height)
+
+    def editorEvent(self, event, model, option, index):
+        # Open the link under the cursor like QTextBrowser did
+        if event.type() == QEvent.MouseButtonRelease and event.button() == Qt.LeftButton:
+            doc = self._layout(index.data(Qt.DisplayRole), option.rect.width())
+            anchor = doc.documentLayout().anchorAt(event.pos() - option.rect.topLeft())
+            if anchor:
+                QDesktopServices.openUrl(QUrl(anchor))
+                return True
+        return super().editorEvent(event, model, option, index)
+
 
 class LogConsumer(QThread):
-    log_received = pyqtSignal(str, str, bool)  # (log_type, message, if_linkify)
+    logs_received = pyqtSignal(list)  # batch of (log_type, created, message, html) rows
     stats_updated = pyqtSignal(dict)     # counters dict
 
-    def __init__(self):
+    def __init__(self, sink=None):
         super().__init__()
         self.running = True
+        self.sink = sink
         self.mutex = QMutex()
-        self.log_queue = []
+        self.condition = QWaitCondition()
+        self.log_queue = deque()
         self.counters = {
             'info': 0,
             'error': 0,
@@ -77,36 +340,67 @@ class LogConsumer(QThread):
             'input': 0            
         }
     
-    def push_log(self, log_type:str, message:str, if_linkify:bool) -> None:
+    def push_log(self, log_type:str, message:str, if_linkify:bool, **fields) -> None:
+        if self.sink is not None:
+            self.sink.emit(log_type, message, **fields)
         self.mutex.lock()
-        self.log_queue.append((log_type, message, if_linkify))
+        self.log_queue.append((log_type, message, if_linkify, time.time()))
+        self.condition.wakeOne()
         self.mutex.unlock()
 
+    def _take_batch(self, stats_interval:int) -> list[tuple]:
+        """Sleep until logs arrive (or the stats are due), then take a batch"""
+        self.mutex.lock()
+        try:
+            if not self.log_queue and self.running:
+                self.condition.wait(self.mutex, stats_interval)
+            count = min(len(self.log_queue), CONFIG['max_batch'])
+            return [self.log_queue.popleft() for _ in range(count)]
+        finally:
+            self.mutex.unlock()
+
     def run(self) -> None:
+        stats_interval = 1000 // CONFIG['stats_fps']
+        last_stats = 0.0
+        stats_dirty = False
+        
         while self.running:
-            self.mutex.lock()
-            if self.log_queue:
-                log_type, message, if_linkify = self.log_queue.pop(0)
-                self.counters[log_type] += 1
-                self.log_received.emit(log_type, message, if_linkify)
+            batch = self._take_batch(stats_interval)
+            
+            # Format outside of the lock, producers never wait for it
+            if batch:
+                for log in batch:
+                    self.counters[log[0]] += 1
+                self.logs_received.emit([(log_type, created, message, format_log(log_type, message, if_linkify, created))
+                                         for log_type, message, if_linkify, created in batch])
+                stats_dirty = True
+            
+            now = time.monotonic()
+            if stats_dirty and (now - last_stats) * 1000 >= stats_interval:
                 self.stats_updated.emit(self.counters.copy())
-            self.mutex.unlock()
-            self.msleep(1)
+                last_stats = now
+                stats_dirty = False
 
     def stop(self) -> None:
+        self.mutex.lock()
         self.running = False
+        self.condition.wakeAll()
+        self.mutex.unlock()
         self.wait()
 
 
 class LoggerApp(QMainWindow):
-    def __init__(self, parent=None, show_ui=True):
+    def __init__(self, parent=None, show_ui=True, sink=None):
         super().__init__(parent)
         self.show_ui = show_ui
+        self.sink = sink
         self._init_ui()
         self._init_worker()
         if not show_ui:
             self.hide()
-        self.info("System Info:", *self.get_sys_info())
+        # cpuinfo alone can take a second, don't block the startup
+        threading.Thread(target=lambda: self.info("System Info:", *self.get_sys_info()),
+                         name='sys-info', daemon=True).start()
     
     def _init_ui(self):
         self.setWindowTitle(CONFIG['app_name'])
@@ -123,20 +417,26 @@ class LoggerApp(QMainWindow):
         main_layout = QVBoxLayout(central_widget)
         main_layout.setSpacing(0)
         
-        # Log display
-        self.log_text = QTextBrowser()
-        self.log_text.setReadOnly(True)
-        self.log_text.setOpenExternalLinks(True)
-        self.log_text.setStyleSheet("""
-            QTextBrowser:focus {
+        # Log display, a virtualized list over a bounded model
+        font = QFont(CONFIG['font_family'])
+        font.setPointSize(CONFIG['font_size'])
+        self.log_model = LogListModel(CONFIG['max_lines'], self)
+        self.log_store = LogStore(CONFIG['max_records'])
+        self.filters = {'levels': None, 'text': None, 'since': None}
+        self.log_view = QListView()
+        self.log_view.setModel(self.log_model)
+        self.log_view.setItemDelegate(LogItemDelegate(font, self.log_view))
+        self.log_view.setUniformItemSizes(True)
+        self.log_view.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.log_view.setVerticalScrollMode(QAbstractItemView.ScrollPerPixel)
+        self.log_view.setMouseTracking(True)
+        self.log_view.setStyleSheet("""
+            QListView:focus {
                 border: 1px solid #7A7A7A;
             }
-            a { color: #000000; text-decoration: none; }
-            a:hover { text-decoration: underline; }
-            a:visited { border: none }
         """)
         
-        main_layout.addWidget(self.log_text)
+        main_layout.addWidget(self.log_view)
         
         # input panel
         self.input_field = QLineEdit()
@@ -167,16 +467,23 @@ class LoggerApp(QMainWindow):
         }
         for label in self.stats_labels.values():
             stats_layout.addWidget(label)
+        self.filter_label = QLabel("")
+        stats_layout.addWidget(self.filter_label)
         
         main_layout.addWidget(stats_widget)
 
     def _init_worker(self):
-        self.consumer = LogConsumer()
-        self.consumer.log_received.connect(self.append_log)
+        self.consumer = LogConsumer(self.sink)
+        self.consumer.logs_received.connect(self.append_rows)
         self.consumer.stats_updated.connect(self.update_stats)
         self.consumer.start()
 
     def get_sys_info(self):
+        import psutil
+        import cpuinfo
+        import GPUtil
+        from prettytable import PrettyTable
+        
         info = {
             "OS Info" : f"{platform.system()} {platform.release()}",
             "Python Version" : platform.python_version(),
@@ -206,62 +513,24 @@ class LoggerApp(QMainWindow):
 
     def _linkify_text(self, text: str) -> str:
         """将文本中的 IP 和 URL 转换为超链接"""
-        # Precompile regular expressions
-        ip_pattern = re.compile(r'\b(?:\d{1,3}\.){3}\d{1,3}(?::\d+)?\b')  # Handle URLs with ports (e.g. 192.168.1.1:8080)
-        url_pattern = re.compile(
-            r'(?:https?|ftp)://[^\s,]+|'  # Match URLs with protocols
-            r'\b(?:[a-zA-Z0-9-]+\.)+[a-zA-Z]{2,}(?::\d+)?(?:/[^\s,]+)?\b'  # Match pure domain names with ports and paths (e.g. google.com:8080/path)
-        )
-
-        def replace_url(match):
-            url = match.group(0)
-            parsed = urlparse(url)
-            if not parsed.scheme:  # Auto-complete the protocol header
-                url = f'http://{url}'
-            return f'<a href="{url}">{escape(match.group(0))}</a>'
-
-        def replace_ip(match):
-            ip = match.group(0)
-            return f'<a href="http://{ip}">{escape(ip)}</a>'
-
-        # Process URLs first, then IPs (Avoid duplicate replacements)
-        text = url_pattern.sub(replace_url, text)
-        text = ip_pattern.sub(replace_ip, text)
-        return text
+        return linkify_text(text)
 
     @pyqtSlot(str, str, bool)
     def append_log(self, log_type: str, message: str, if_linkify:bool):
-        color_map = {
-            'info' : '#C0C000',
-            'error' : '#C03030',
-            'false' : '#C00000',
-            'debug' : '#C000C0',
-            'input' : '#202020',
-            'timestamp' : '#858585',
-            'content' : '#000000'
-        }
-        timestamp = datetime.now().strftime("[%H:%M:%S]")
-        log_label = f"[{log_type.upper()}]&nbsp;" if log_type == "info" else "&nbsp;&nbsp;>>>&nbsp;&nbsp;" if log_type == "input" else f"[{log_type.upper()}]"
-
-        # Process urls in the message
-        processed_msg = self._linkify_text(escape(message)) if if_linkify else message
-
-        log_html = f"""
-            <div style="margin-bottom: 2px;
-                        line-height: 1.4em;
-                        font-family: {CONFIG['font_family']};
-                        font-size: {CONFIG['font_size']}pt;
-                        border-bottom: 1px solid #101010;
-                        padding: 1px 0;">
-                <span style="color: {color_map['timestamp']}">{timestamp}</span>
-                <span style="color: {color_map[log_type]}">{log_label}</span>
-                <span style="color: {color_map['content']}">{processed_msg}</span>
-            </div>
-        """
-        self.log_text.moveCursor(QTextCursor.End)
-        self.log_text.insertHtml(log_html)
-        self.log_text.insertPlainText("\n")
-        self.log_text.ensureCursorVisible()
+        created = time.time()
+        self.append_rows([(log_type, created, message, format_log(log_type, message, if_linkify, created))])
+    
+    @pyqtSlot(list)
+    def append_rows(self, rows: list):
+        self.log_store.add(rows)
+        if any(self.filters.values()):
+            rows = [row for row in rows if LogStore.matches(row, **self.filters)]
+        scrollbar = self.log_view.verticalScrollBar()
+        at_bottom = scrollbar.value() >= scrollbar.maximum()
+        self.log_model.append_rows(rows)
+        # Only follow new logs when the user is not reading older ones
+        if at_bottom:
+            self.log_view.scrollToBottom()
     
     @pyqtSlot(dict)
     def update_stats(self, counters: dict):
@@ -274,6 +543,55 @@ class LoggerApp(QMainWindow):
         cmd = self.input_field.text()
         self.input(cmd)
         self.input_field.clear()
+        self.run_command(cmd)
+    
+    def run_command(self, cmd: str):
+        """Log view commands:
+        
+        filter <level...>  show only these levels, `filter all` shows every level
+        grep <text>        show logs containing text, a `/path` searches the request paths
+        since <HH:MM[:SS]> show logs from today's time on
+        clear              remove all filters
+        """
+        name, _, arg = cmd.strip().partition(' ')
+        name, arg = name.lower(), arg.strip()
+        
+        if name == 'filter':
+            levels = {level.lower() for level in arg.split()} - {'all'}
+            unknown = levels - set(COLOR_MAP) - {'timestamp', 'content'}
+            if unknown:
+                self.error(f"Unknown log level: {', '.join(sorted(unknown))}")
+                return
+            self.filters['levels'] = levels or None
+        elif name == 'grep':
+            self.filters['text'] = arg or None
+        elif name == 'since':
+            if not arg:
+                self.filters['since'] = None
+            else:
+                try:
+                    since = dt_time.fromisoformat(arg)
+                except ValueError:
+                    self.error(f"Bad time: {arg}, use HH:MM or HH:MM:SS")
+                    return
+                self.filters['since'] = datetime.combine(datetime.now().date(), since).timestamp()
+        elif name == 'clear':
+            self.filters = {'levels': None, 'text': None, 'since': None}
+        elif name == 'help':
+            self.info(*[line.strip() for line in self.run_command.__doc__.splitlines()[2:] if line.strip()])
+            return
+        else:
+            return
+        self.apply_filters()
+    
+    def apply_filters(self):
+        rows = self.log_store.query(**self.filters, limit=self.log_model.rows.capacity)
+        self.log_model.reset_rows(rows)
+        self.log_view.scrollToBottom()
+        
+        active = [f"{key}={value if key != 'since' else datetime.fromtimestamp(value).strftime('%H:%M:%S')}"
+                  for key, value in self.filters.items() if value]
+        self.filter_label.setText(f"FILTER: {', '.join(active)} ({len(rows)} shown)" if active else "")
     
     def closeEvent(self, event):
         if hasattr(self, 'consumer'):
@@ -281,21 +599,21 @@ class LoggerApp(QMainWindow):
         return super().closeEvent(event)
     
     # Public API methods
-    def info(self, *messages, if_linkify=True):
+    def info(self, *messages, if_linkify=True, **fields):
         for message in messages:
-            self.consumer.push_log('info', str(message), if_linkify)
+            self.consumer.push_log('info', str(message), if_linkify, **fields)
     
-    def error(self, *messages, if_linkify=True):
+    def error(self, *messages, if_linkify=True, **fields):
         for message in messages:
-            self.consumer.push_log('error', str(message), if_linkify)
+            self.consumer.push_log('error', str(message), if_linkify, **fields)
 
-    def false(self, *messages, if_linkify=True):
+    def false(self, *messages, if_linkify=True, **fields):
         for message in messages:
-            self.consumer.push_log('false', str(message), if_linkify)
+            self.consumer.push_log('false', str(message), if_linkify, **fields)
 
-    def debug(self, *messages, if_linkify=True):
+    def debug(self, *messages, if_linkify=True, **fields):
         for message in messages:
-            self.consumer.push_log('debug', str(message), if_linkify)
+            self.consumer.push_log('debug', str(message), if_linkify, **fields)
     
     def input(self, message, if_linkify=True):
         self.consumer.push_log('input', str(message), if_linkify)
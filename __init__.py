@@ -3,14 +3,24 @@
 
 """
 This python module use to install necessary libraries for the web app.
+
+Installation only runs when one of the required modules can't be found,
+so a normal start doesn't pay for a `uv pip install`.
 """
 
 import os, platform
+from importlib.util import find_spec
 
 
 _path = ".\\.venv\\Scripts\\"
 
-if platform.python_version().split(".")[1] > '11':
-    os.system(f"uv pip install setuptools")
+REQUIRED_MODULES = (
+    'flask', 'requests', 'bs4', 'lxml', 'fake_useragent', 'colorama',
+    'pandas', 'openpyxl', 'numpy', 'PyQt5', 'psutil', 'cpuinfo', 'GPUtil', 'prettytable',
+)
+
+if any(find_spec(module) is None for module in REQUIRED_MODULES):
+    if platform.python_version().split(".")[1] > '11':
+        os.system(f"uv pip install setuptools")
 
-os.system(f"uv pip install -r requirements.txt")
\ No newline at end of file
+    os.system(f"uv pip install -r requirements.txt")
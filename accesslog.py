@@ -0,0 +1,119 @@
+# !/.venv/Scripts python3
+# -*- coding: utf-8 -*-
+
+"""Access log sampling and summaries for Rhythm Game Music guessing game.
+
+Author:      Imyuru_ (Imyuru_H)
+Version:     0.0.3
+Update Time: 25/06/25
+"""
+
+""" Update Logs:
+ - 0.0.1:
+     - Create this module, sample 2xx/3xx access logs and summarize every interval.
+ - 0.0.2:
+     - Restart the summary thread in forked workers.
+ - 0.0.3:
+     - Draw the sample decision at the start of a request, so its detail logs can follow it.
+"""
+
+__version__ = '0.0.3'
+__author__ = 'Imyuru_'
+
+# Copyright (c) 2025 Imyuru_. Licensed under MIT License.
+
+import time
+import random
+import threading
+from collections import Counter, deque
+
+
+class AccessLog:
+    """Decide which requests get their own log line and summarize the rest.
+
+    The request thread only appends one tuple to a deque (atomic, no lock).
+    A daemon thread drains it every `interval` seconds, counts the entries
+    and hands the summary lines to `emit(*lines)`.
+    """
+    def __init__(self, emit, sample_rate:float = 1.0, interval:float = 10.0, top:int = 3):
+        """
+        Args:
+            emit: called with the summary lines, e.g. `logs.info`
+            sample_rate: share of 2xx/3xx requests logged one by one, errors are always logged
+            interval: seconds between two summaries, 0 to never summarize
+            top: paths and client ips listed in a summary
+        """
+        self.emit = emit
+        self.sample_rate = sample_rate
+        self.interval = interval
+        self.top = top
+        self.pending:deque[tuple[str, int, str]] = deque()
+
+        self._stop = threading.Event()
+        self._thread = None
+        if interval > 0:
+            self._thread = threading.Thread(target=self._run, name='access-summary', daemon=True)
+            self._thread.start()
+
+    def sample(self) -> bool:
+        """Whether a new request is among the sampled ones"""
+        return self.sample_rate >= 1 or random.random() < self.sample_rate
+
+    def record(self, path:str, status_code:int, client_ip:str, sampled:bool|None = None) -> bool:
+        """Count one request, returns whether it should be logged on its own.
+
+        `sampled` is the decision of `sample()` drawn earlier for the request,
+        a new one is drawn without it.
+        """
+        if self._thread is not None:
+            self.pending.append((path, status_code, client_ip))
+        if status_code >= 400:
+            return True
+        return self.sample() if sampled is None else sampled
+
+    def after_fork(self) -> None:
+        """Call in a forked child, the summary thread doesn't survive fork"""
+        self.pending = deque()
+        self._stop = threading.Event()
+        if self._thread is not None:
+            self._thread = threading.Thread(target=self._run, name='access-summary', daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def summarize(self, seconds:float) -> list[str]:
+        """Drain the pending requests into summary lines, [] if there were none"""
+        paths, statuses, clients = Counter(), Counter(), Counter()
+        count = 0
+        pending = self.pending
+        while pending:
+            try:
+                path, status_code, client_ip = pending.popleft()
+            except IndexError:
+                break
+            paths[path] += 1
+            statuses[f"{status_code // 100}xx"] += 1
+            clients[client_ip] += 1
+            count += 1
+        if not count:
+            return []
+
+        return [
+            f"Access summary: {count} requests in {seconds:.1f}s, {count / seconds:.1f} req/s",
+            f" - status: {', '.join(f'{status} {n}' for status, n in sorted(statuses.items()))}",
+            f" - top paths: {', '.join(f'{path} {n}' for path, n in paths.most_common(self.top))}",
+            f" - top clients: {', '.join(f'{ip} {n}' for ip, n in clients.most_common(self.top))}",
+        ]
+
+    def _run(self) -> None:
+        last_time = time.monotonic()
+        while not self._stop.wait(self.interval):
+            now = time.monotonic()
+            lines = self.summarize(now - last_time)
+            last_time = now
+            if lines:
+                try:
+                    self.emit(*lines, if_linkify=False)
+                except Exception as e:
+                    print(f"Access summary failed: {str(e)}")
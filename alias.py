@@ -0,0 +1,191 @@
+# !/.venv/Scripts python3
+# -*- coding: utf-8 -*-
+
+"""Alias indexes for Rhythm Game Music guessing game.
+
+Author:      Imyuru_ (Imyuru_H)
+Version:     0.0.2
+Update Time: 25/06/04
+"""
+
+""" Update Logs:
+ - 0.0.1:
+     - Create this module, add the inverted alias index and prefix completion.
+ - 0.0.2:
+     - Add n-gram fuzzy matching for misspelled guesses.
+"""
+
+__version__ = '0.0.2'
+__author__ = 'Imyuru_'
+
+# Copyright (c) 2025 Imyuru_. Licensed under MIT License.
+
+import unicodedata
+from bisect import bisect_left
+from collections import Counter
+from heapq import nlargest
+from itertools import chain
+
+
+def normalize(text:str) -> str:
+    """Fold width, case and spacing: 'Ｅｎｇｉｎｅ x  Start' -> 'enginexstart'"""
+    text = unicodedata.normalize('NFKC', text).casefold()
+    return ''.join(text.split())
+
+
+def _grams(text:str, n:int = 2) -> set[str]:
+    """Padded character n-grams, '冰川' -> {'^冰', '冰川', '川$'}"""
+    text = f"^{text}$"
+    if len(text) <= n:
+        return {text}
+    return {text[i:i+n] for i in range(len(text) - n + 1)}
+
+
+def _edit_distance(a:str, b:str, limit:int) -> int:
+    """Levenshtein distance, gives up with `limit + 1` once it is over `limit`"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        cur = [i]
+        for j, cb in enumerate(b, 1):
+            cur.append(min(prev[j] + 1, cur[j-1] + 1, prev[j-1] + (ca != cb)))
+        if min(cur) > limit:
+            return limit + 1
+        prev = cur
+    return prev[-1]
+
+
+class FuzzyIndex:
+    """Bigram inverted index over normalized aliases.
+
+    A query only touches the posting lists of its own bigrams and ranks the
+    best few candidates by Dice similarity, short aliases are confirmed with
+    a bounded edit distance. The cost depends on the query and the posting
+    lengths, not on the size of the bank.
+    """
+    # Candidates ranked for one query
+    VERIFY_LIMIT = 16
+    # Min Dice similarity of a match, short aliases may pass by edit distance instead
+    MIN_SIMILARITY = 0.5
+    SHORT_ALIAS = 4
+
+    def __init__(self, index:dict[str, tuple[str, ...]]):
+        norm_index:dict[str, list[str]] = {}
+        for alias, titles in index.items():
+            key = normalize(alias)
+            if not key:
+                continue
+            merged = norm_index.setdefault(key, [])
+            merged.extend(title for title in titles if title not in merged)
+
+        self.keys:list[str] = list(norm_index)
+        self.titles:list[tuple[str, ...]] = [tuple(norm_index[key]) for key in self.keys]
+        self.exact:dict[str, int] = {key: i for i, key in enumerate(self.keys)}
+        self.gram_count:list[int] = []
+
+        postings:dict[str, list[int]] = {}
+        for i, key in enumerate(self.keys):
+            grams = _grams(key)
+            self.gram_count.append(len(grams))
+            for gram in grams:
+                postings.setdefault(gram, []).append(i)
+        self.postings:dict[str, tuple[int, ...]] = {gram: tuple(ids) for gram, ids in postings.items()}
+
+    def match(self, query:str, k:int = 5) -> list[str]:
+        """Titles ranked by how close one of their aliases is to `query`"""
+        query = normalize(query)
+        if not query:
+            return []
+        if query in self.exact:
+            return list(self.titles[self.exact[query]][:k])
+
+        grams = _grams(query)
+        shared = Counter(chain.from_iterable(self.postings.get(gram, ()) for gram in grams))
+        if not shared:
+            return []
+
+        n = len(grams)
+        gram_count = self.gram_count
+        best = nlargest(self.VERIFY_LIMIT, shared.items(), key=lambda item: item[1] / (n + gram_count[item[0]]))
+        limit = max(1, len(query) // 4)
+        short = len(query) <= self.SHORT_ALIAS
+
+        ranked = []
+        for i, count in best:
+            dice = 2 * count / (n + gram_count[i])
+            # Edit distance is only needed for the short aliases Dice is unfair to
+            if dice >= self.MIN_SIMILARITY or (short and _edit_distance(query, self.keys[i], limit) <= limit):
+                ranked.append((-dice, i))
+        ranked.sort()
+
+        result = []
+        for _, i in ranked:
+            for title in self.titles[i]:
+                if title not in result:
+                    result.append(title)
+                    if len(result) == k:
+                        return result
+        return result
+
+
+class AliasIndex:
+    """Inverted alias -> titles index with sorted-array prefix completion.
+
+    Built once from the `nick_dict` of the song store (title -> lowered
+    aliases, the title itself included).
+    """
+    # Max aliases looked at for one completion, keeps short prefixes bounded
+    SCAN_LIMIT = 256
+
+    def __init__(self, nick_dict:dict[str, list[str]]):
+        index:dict[str, list[str]] = {}
+        for title, aliases in nick_dict.items():
+            for alias in aliases:
+                titles = index.setdefault(alias, [])
+                if title not in titles:
+                    titles.append(title)
+
+        self.index:dict[str, tuple[str, ...]] = {alias: tuple(titles) for alias, titles in index.items()}
+        self._keys:list[str] = sorted(self.index)
+        self.fuzzy_index = FuzzyIndex(self.index)
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def resolve(self, alias:str) -> list[str]:
+        """All titles having exactly this alias (case insensitive)"""
+        return list(self.index.get(alias.lower(), ()))
+
+    def fuzzy(self, alias:str, k:int = 5) -> list[str]:
+        """Ranked candidate titles for a misspelled alias"""
+        return self.fuzzy_index.match(alias, k)
+
+    def suggest(self, prefix:str, k:int = 10) -> list[str]:
+        """Top-k titles with an alias starting with `prefix`.
+
+        Shorter aliases (closer to what was typed) come first, ties keep the
+        alphabetical order of the aliases.
+        """
+        prefix = prefix.lower()
+        if not prefix or k <= 0:
+            return []
+
+        lo = bisect_left(self._keys, prefix)
+        hi = min(lo + self.SCAN_LIMIT, len(self._keys))
+        matched = []
+        for i in range(lo, hi):
+            key = self._keys[i]
+            if not key.startswith(prefix):
+                break
+            matched.append(key)
+        matched.sort(key=len)
+
+        result = []
+        for key in matched:
+            for title in self.index[key]:
+                if title not in result:
+                    result.append(title)
+                    if len(result) == k:
+                        return result
+        return result
@@ -7,8 +7,8 @@ import __init__
 """A simple app for Rhythm Game Music guessing game.
 
 Author:      Imyuru_ (Imyuru_H)
-Version:     0.0.3
-Update Time: 25/05/25
+Version:     0.2.5
+Update Time: 25/06/25
 """
 
 """Update Log:
@@ -19,66 +19,169 @@ Update Time: 25/05/25
 0.0.3:
  - Fix bugs for some possible situation.
  - Realize nick name identify.
+0.0.4:
+ - Serve song info from the local song store, crawl only to enrich missing fields.
+0.0.5:
+ - Resolve nick names with an inverted alias index.
+ - Add `/suggest` for input type-ahead.
+0.0.6:
+ - Offer the closest songs for misspelled guesses.
+0.0.7:
+ - Pre-warm the shared BPM table instead of a throwaway crawler.
+0.0.8:
+ - Fill the song store from the crawled song snapshot when there is one.
+0.0.9:
+ - Add headless mode (`--headless` or MUSICGUESS_HEADLESS=1) without Qt and with lazy heavy imports.
+ - Log an import time breakdown.
+0.1.0:
+ - Write structured JSONL logs with rotation through an async LogSink, requests only enqueue.
+0.1.1:
+ - Time the stages of each request, send them as a `Server-Timing` header.
+ - Add `/metrics` with request counters and latency histograms in Prometheus format.
+0.1.2:
+ - Sample the access logs of 2xx/3xx responses, log a traffic summary every interval instead.
+0.1.3:
+ - `/submit` sends the precomputed JSON row of the song, html only when asked with `"html": true`.
+0.1.4:
+ - `/start` picks a target song for a new game session, `/submit` answers with column feedback.
+0.1.5:
+ - Keep player sessions in a sharded store with TTL/LRU eviction, the session id is also sent as a cookie.
+ - Report the session store stats at `/metrics`.
+0.1.6:
+ - Add the multi-process production mode (`--workers N` or MUSICGUESS_WORKERS=N), workers are forked
+   after the song store is loaded and share it.
+0.1.7:
+ - Add the daily song (`/daily`, `"daily": true` in `/submit`), answered from the precomputed feedback table.
+0.1.8:
+ - Add `/hint`, the remaining candidates and the guesses with the most expected information.
+0.1.9:
+ - Report failed enrich crawls through the app logger.
+0.2.0:
+ - The `/submit` trace logs follow the access log sampling, unsampled requests only log errors.
+0.2.1:
+ - The workers keep the games in one SQLite session store instead of rebuilding them from signed ids.
+0.2.2:
+ - `/daily` starts a session on the daily song, daily hints only use the guesses recorded in it.
+ - Validate and clamp the `k` of `/hint`.
+0.2.3:
+ - Catch the crawler parse errors by their real type.
+0.2.4:
+ - Size the session store with the number of songs, a session remembers its guesses in a bitset.
+0.2.5:
+ - The workers share the feature and feedback tables of the game engine instead of copying them.
 """
 
-__version__ = '0.0.3'
+__version__ = '0.2.5'
 __author__ = 'Imyuru_'
 
 # Copyright (c) 2025 Imyuru_. Licensed under MIT License.
 
 import os, sys, time, random
+import datetime
+import importlib
 os.environ["PYTHONIOENCODING"] = "utf-8"
 start_time = time.time()
 
+import_times:dict[str, float] = {}
+def timed_import(name:str):
+    """Import a module and remember how long it took"""
+    t = time.perf_counter()
+    module = importlib.import_module(name)
+    import_times[name] = time.perf_counter() - t
+    return module
+
 # import numpy as np
+timed_import('flask')
 from flask import *
-import pandas as pd
 import logging
 import queue
 import threading
-from PyQt5.QtWidgets import QApplication
 
-import NonUiLog, UiLog
-import crawler
+crawler = timed_import('crawler')
+songstore = timed_import('songstore')
+alias = timed_import('alias')
+LogSink = timed_import('LogSink')
+metrics = timed_import('metrics')
+accesslog = timed_import('accesslog')
+game = timed_import('game')
+session = timed_import('session')
+prefork = timed_import('prefork')
 
 
 # config app settings
 CONFIGS = {
+    'headless' : os.environ.get('MUSICGUESS_HEADLESS', '0') == '1' or '--headless' in sys.argv,
+    # Worker processes of the production mode, 1 runs the development server
+    'workers' : int(sys.argv[sys.argv.index('--workers') + 1] if '--workers' in sys.argv
+                    else os.environ.get('MUSICGUESS_WORKERS', '1')),
     'ui_logging' : True,
     'show_log' : True,
     'flask_debug' : False,
+    'flask_host' : '127.0.0.1',
     'flask_port' : 1145,
     'app_name' : 'Firefly',
-    'templates_reload' : True
+    'templates_reload' : True,
+    'crawl_enrich' : True,  # Crawl the fields the quest bank lacks in background
+    'log_file' : os.path.join('logs', 'app.jsonl'),  # None to keep logs out of disk
+    'access_log_sample' : 0.1,  # Share of 2xx/3xx requests logged one by one, errors are always logged
+    'access_log_interval' : 10,  # Seconds between access summaries, 0 to disable
+    'session_ttl' : 1800,  # Seconds a game is kept after the last guess
+    'max_sessions' : 100000,
+    'session_max_bytes' : 64 * 1024**2,  # Hard memory cap of the session store
+    'session_db' : os.path.join('.cache', 'sessions.sqlite3'),  # Session store shared by the workers
 }
+# The production mode has no Qt event loop
+if CONFIGS['workers'] > 1:
+    CONFIGS['headless'] = True
+# Headless mode never imports Qt, GPUtil or cpuinfo
+if CONFIGS['headless']:
+    CONFIGS['ui_logging'] = False
     
 # init log
-app_qt = QApplication([])
+log_sink = LogSink.LogSink(CONFIGS['log_file'])
 if CONFIGS['ui_logging']:
-    logs = UiLog.LoggerApp(show_ui=CONFIGS['show_log'])
+    QApplication = timed_import('PyQt5.QtWidgets').QApplication
+    UiLog = timed_import('UiLog')
+    app_qt = QApplication([])
+    logs = UiLog.LoggerApp(show_ui=CONFIGS['show_log'], sink=log_sink)
 else:
-    logs = NonUiLog.Info()
+    NonUiLog = timed_import('NonUiLog')
+    logs = NonUiLog.Info(clear=not CONFIGS['headless'],
+                         sys_info_background=CONFIGS['headless'],
+                         full_sys_info=not CONFIGS['headless'],
+                         sink=log_sink)
 logs.info("Logger app init done.")
+logs.info("Import time:", *[f" - {name}: {duration*1000:.1f} ms" for name, duration in import_times.items()])
     
 # init crawler
 phi_crawler = crawler.PhiCrawler()
 logs.info("Crawler init done.")
 
 # init quest bank
-def init_quest() -> tuple[list[str], dict[str, list[str]]]:
-    quest_bank:pd.DataFrame = pd.read_excel('static\\quest_bank\\quest_phigros.xlsx',
-                                            sheet_name='quest_phigros')
-    
-    titles:list[str] = [str(nick) for nick in quest_bank['name'].values]
-    
-    nicks:list[list[str]] = [([] if nick == 'nan' else nick.split(';')) for nick in [str(nick) for nick in quest_bank['nick name'].values]]
-    
-    nick_dict:dict = {titles[i]:[titles[i].lower()] + [nick.lower() for nick in nicks[i]] for i in range(len(titles))}
+def init_quest() -> tuple[songstore.SongStore, alias.AliasIndex]:
+    store = songstore.SongStore(songstore.read_quest_bank())
+    store.load_snapshot()
     
-    return titles, nick_dict
+    return store, alias.AliasIndex(store.nick_dict)
 
-title_lst, nick_dict = init_quest()
-logs.info("Quest bank init done.")
+song_store, alias_index = init_quest()
+title_lst, nick_dict = song_store.titles, song_store.nick_dict
+logs.info(f"Quest bank init done. {len(song_store)} songs loaded.")
+
+# init game engine
+if CONFIGS['workers'] > 1:
+    # Any worker can answer any guess, so the games live in a file they all open
+    session_store = session.SharedSessionStore(CONFIGS['session_db'], len(song_store),
+                                               ttl=CONFIGS['session_ttl'],
+                                               max_sessions=CONFIGS['max_sessions'])
+else:
+    session_store = session.SessionStore(len(song_store),
+                                         ttl=CONFIGS['session_ttl'],
+                                         max_sessions=CONFIGS['max_sessions'],
+                                         max_bytes=CONFIGS['session_max_bytes'])
+game_engine = game.GameEngine(song_store, session_store)
+logs.info(f"Game engine init done. Feature matrix: {game_engine.features.shape}, "
+          f"max sessions: {session_store.max_sessions} ({type(session_store).__name__})")
 
 # init flask app
 app = Flask(CONFIGS['app_name'])
@@ -95,8 +198,18 @@ werkzeug_logger.propagate = False  # Deny log propagete
 werkzeug_logger.setLevel(logging.CRITICAL)  # Set log level
 
 log_queue = queue.Queue(-1) # Unlimited queue
+access_log = accesslog.AccessLog(logs.info,
+                                 sample_rate=CONFIGS['access_log_sample'],
+                                 interval=CONFIGS['access_log_interval'])
 logs.info("Flask logging handlers init done.")
 
+# Time request stages
+@app.before_request
+def start_request_timer():
+    g.timer = metrics.StageTimer()
+    # Drawn once, the access line and the detail logs of a request are kept or dropped together
+    g.sampled = access_log.sample()
+
 # Process logs
 @app.after_request
 def capture_response_data(response):
@@ -123,12 +236,30 @@ def capture_response_data(response):
     # Dynamically retrieve logging methods to avoid AttributeError caused by typos
     log_method = getattr(logs, log_level, logs.error)
     log_content = f"- {data['method']} {data['status_code']} - from {data['client_ip']}, calling {data['path']}"
-    log_method(f"Status {data['status_code']}: {log_content}", if_linkify=False)
+    timer:metrics.StageTimer|None = g.get('timer')
+    if timer is None:  # A before_request hook failed
+        log_method(f"Status {data['status_code']}: {log_content}", if_linkify=False, **data)
+        return response
+    
+    # Only enqueued here, formatting and writing happen in the log threads
+    with timer.stage('log'):
+        if access_log.record(data['path'], data['status_code'], data['client_ip'], g.get('sampled')):
+            log_method(f"Status {data['status_code']}: {log_content}", if_linkify=False, **data,
+                       stages={stage: round(seconds*1000, 3) for stage, seconds in timer.stages.items()})
+    
+    # Route rules keep the label count bounded, unlike raw paths
+    labels = {'method': data['method'],
+              'path': request.url_rule.rule if request.url_rule is not None else 'unmatched'}
+    metrics.METRICS.inc('requests_total', {**labels, 'status': str(data['status_code'])})
+    metrics.METRICS.observe_timer(timer, labels)
+    response.headers['Server-Timing'] = timer.header()
     
     return response
 
 
 # define flask app routes
+SESSION_COOKIE = 'musicguess_session'
+
 @app.route('/')
 def index():
     return render_template("home.html")
@@ -139,16 +270,58 @@ def single():
 
 @app.route('/start', methods=['POST'])
 def start():
-    global title_lst
+    session_id = game_engine.start()
+    logs.debug(f"Game start: {session_id}")
+    
+    response = jsonify({'operation': 'game start', 'status': True, 'quest': 'start', 'session': session_id})
+    response.set_cookie(SESSION_COOKIE, session_id, max_age=CONFIGS['session_ttl'], httponly=True, samesite='Lax')
+    return response
+
+@app.route('/daily', methods=['GET'])
+def daily():
+    # A session on today's song, so hints only know the guesses really made
+    session_id = game_engine.start(game_engine.titles[game_engine.daily_target()])
+    logs.debug(f"Daily game start: {session_id}")
     
-    return jsonify({'operation': 'game start', 'status': True, 'quest': 'start'})
+    response = jsonify({'operation': 'daily', 'status': True, 'date': datetime.date.today().isoformat(),
+                        'session': session_id})
+    response.set_cookie(SESSION_COOKIE, session_id, max_age=CONFIGS['session_ttl'], httponly=True, samesite='Lax')
+    return response
+
+@app.route('/hint', methods=['POST'])
+def hint():
+    data = request.get_json(silent=True) or {}
+    k = data.get('k', 3)
+    if not isinstance(k, int) or isinstance(k, bool):
+        k = 3  # Like `type=int` of the query args
+    k = max(1, min(k, 10))
+    
+    # Daily games have a session too, the guesses always come from the server
+    session_id:str|None = data.get('session') or request.cookies.get(SESSION_COOKIE)
+    with g.timer.stage('hint'):
+        result = game_engine.session_hint(session_id, k) if session_id else None
+    if result is None:
+        return jsonify({'operation': 'hint', 'status': False, 'error': '游戏还没开始喵~'})
+    
+    return jsonify({'operation': 'hint', 'status': True, **result})
+
+@app.route('/metrics', methods=['GET'])
+def export_metrics():
+    # With workers, only the metrics of the worker answering this request
+    for name, value in session_store.stats().items():
+        metrics.METRICS.set_gauge(f"session_{name}", value)
+    return Response(metrics.METRICS.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/suggest', methods=['GET'])
+def suggest():
+    query:str = request.args.get('q', '').strip()
+    k:int = min(request.args.get('k', 10, type=int), 20)
+    
+    return jsonify({'operation': 'suggest', 'status': True, 'suggestions': alias_index.suggest(query, k)})
 
 @app.route('/submit', methods=['POST'])
 def parse_data():
-    def _find_all_keys(d:dict[str, list[str]], target:str) -> list[str]:
-        return [key for key, lst in d.items() if target in lst]
-
-    global nick_dict
+    global alias_index
     
     if not request.is_json:  # Check if Content-Type is application/json
         return jsonify({"error": "Unsupported Media Type: 需要 JSON 数据"}), 415
@@ -163,44 +336,68 @@ def parse_data():
         logs.info("User Input: None")
         return jsonify({'operation': 'input submit', 'status': False})
     
-    logs.info(f"User Input: {title}")
-    title:list[str] = _find_all_keys(nick_dict, title.lower())
-    logs.info(f" -> {title}")
+    timer:metrics.StageTimer = g.timer
+    traced:bool = g.get('sampled', True)  # Unsampled guesses skip the trace logs, like their access line
+    user_input:str = title
+    with timer.stage('alias'):
+        title:list[str] = alias_index.resolve(user_input)
+    if traced:
+        logs.info(f"User Input: {user_input}", f" -> {title}")
+    
+    if not title:
+        # Maybe misspelled, let the user choose from the closest songs
+        with timer.stage('fuzzy'):
+            title = alias_index.fuzzy(user_input)
+        if traced:
+            logs.info(f" -> fuzzy: {title}")
+        if title:
+            return jsonify({'operation': 'input submit', 'status': True, 'title': title, 'fuzzy': True})
+    
+    if len(title) != 1:
+        return jsonify({'operation': 'input submit', 'status': True, 'title': title})
     
-    if len(title) == 1:
+    start_time = time.time()
+    with_html:bool = bool(data.get('html'))  # Clients inserting the html row ask for it
+    with timer.stage('store'):
+        body = song_store.response(title[0], with_html)
+    if body is None:
+        # Fallback: the song is not in the quest bank, crawl it directly
+        crawl_timings = {}
         try:
-            data, duration = phi_crawler.run(title[0])
-            data = [data]
-        except AttributeError as e:
+            with timer.stage('crawl'):
+                song, duration = phi_crawler.run(title[0], timings=crawl_timings)
+        except (KeyError, ValueError) as e:  # Not a song page, see crawler.PageParseError
             print(e)
             return jsonify({'operation': 'input submit', 'error':'没有这个别名哦喵~', 'status': False})
-    else:
-        return jsonify({'operation': 'input submit', 'status': True, 'title': title})
+        for source, seconds in crawl_timings.items():
+            timer.add(f"crawl_{source}", seconds)
+        if 'artist' not in song:
+            logs.error(f"Crawler: {title[0]} not crawled in {duration:.2f} Seconds")
+            return jsonify({'operation': 'input submit', 'error':'查询超时了喵~', 'status': False})
+        song.setdefault('bpm', '')
+        logs.info(f"Crawler: - Time cost: {duration:.2f} Seconds")
+        with timer.stage('render'):
+            body = songstore.render_response(title[0], song)[1 if with_html else 0]
+    elif CONFIGS['crawl_enrich'] and song_store.enrich_async(title[0], phi_crawler, log=logs.error):
+        logs.info(f"Crawler: enrich {song_store.missing_fields(title[0])} of {title[0]} in background")
     
-    logs.info("Crawler:",
-              *[f" - Song data {data.index(d)}: {d}" for d in data],
-              f" - Time cost: {duration:.2f} Seconds")
+    session_id:str|None = data.get('session') or request.cookies.get(SESSION_COOKIE)
+    if data.get('daily') or session_id:
+        with timer.stage('game'):
+            if session_id:
+                feedback = game_engine.guess(session_id, title[0])
+            else:
+                # Daily guesses without a session, answered from the table but never counted
+                feedback = game_engine.daily_guess(title[0])
+        if feedback is not None:
+            body = songstore.extend_response(body, feedback=feedback)
     
-    html = [f"""
-<tr id="column">
-    <td>{title[i]}</td>
-    <td>{data[i]['artist']}</td>
-    <td>{data[i]['bpm']}</td>
-    <td>{"✅" if len(data[i]['level']) == 4 else "❌"}</td>
-    <td>
-        <span>{data[i]['level'][0]}</span>
-        <span>{data[i]['level'][1]}</span>
-        <span>{data[i]['level'][2]}</span>
-        {f"<span>{data[i]['level'][3]}</span>" if len(data[i]['level']) == 4 else ''}
-    </td>
-    <td>{data[i]['note count'][-1]}</td>
-    <td>{data[i]['pack']}</td>
-</tr>""" for i in range(len(data))]
-
-    logs.info(*html)
+    if traced:
+        with timer.stage('log'):
+            logs.info(f"Song store: - {title[0]} - Time cost: {(time.time() - start_time)*1000:.3f} ms")
     
-    return jsonify({'operation': 'input submit', 'status': True, 'html': html, 'title': title})
-
+    # Rows are rendered once per song, the cached body is sent as it is
+    return Response(body, mimetype='application/json')
 
 if __name__ == "__main__":
     end_time = time.time()
@@ -209,27 +406,51 @@ if __name__ == "__main__":
     def run_flask_app():
         app.run(debug=CONFIGS['flask_debug'], 
                 use_reloader=False, 
+                host=CONFIGS['flask_host'],
                 port=CONFIGS['flask_port'])
     
     def crawler_init():
         start_time = time.time()
-        moe_crawler = crawler.MoeCrawler()
-        moe_crawler._fetch(crawler.Config.START_URL_MOE)
-        logs.info(f"Crawler initialize over. Duration: {(time.time() - start_time):.2f} seconds")
+        crawler.BPM_TABLE.start()
+        if crawler.BPM_TABLE.wait(crawler.Config.TIMEOUT * crawler.Config.MAX_RETRY):
+            logs.info(f"Crawler initialize over. Duration: {(time.time() - start_time):.2f} seconds")
+        else:
+            logs.error("Crawler initialize timeout, BPM table will keep retrying in background.")
     
-    # Define flask thread
-    flask_thread = threading.Thread(target=run_flask_app, daemon=True)
     # Define Crawler init thread
-    crawler_init_thread = threading.Thread(target=crawler_init)
+    crawler_init_thread = threading.Thread(target=crawler_init, daemon=True)
     
-    # Start Flask app's thread
-    flask_thread.start()
-    logs.info(f" * Serving Flask app '{CONFIGS['app_name']}' on 127.0.0.1:{CONFIGS['flask_port']}",
+    logs.info(f" * Serving Flask app '{CONFIGS['app_name']}' on {CONFIGS['flask_host']}:{CONFIGS['flask_port']}",
               f" * Debug mode: {'on' if CONFIGS['flask_debug'] else 'off'}")
+    
+    if CONFIGS['workers'] > 1 and not prefork.can_fork():
+        logs.error("Fork is not available on this platform, serving from one process.")
+    elif CONFIGS['workers'] > 1:
+        def init_worker(n:int):
+            # Threads and the sqlite connection don't survive fork
+            base, ext = os.path.splitext(CONFIGS['log_file']) if CONFIGS['log_file'] else (None, None)
+            log_sink.after_fork(f"{base}.worker{n}{ext}" if base else None)
+            access_log.after_fork()
+            crawler.Crawler.reset_cache()
+            session_store.after_fork()
+            threading.Thread(target=crawler_init, daemon=True).start()
+            logs.info(f"Worker {n} (pid {os.getpid()}) ready.")
+        
+        # Mapped once here, the workers read and update the same tables
+        game_engine.share()
+        logs.info(f"Game engine tables shared: {game_engine.feedback.nbytes + game_engine.feedback_keys.nbytes} bytes.")
+        prefork.serve(app, CONFIGS['flask_host'], CONFIGS['flask_port'], CONFIGS['workers'],
+                      on_child=init_worker, log=logs.info)
+        sys.exit(0)
+    
     # Start Crawler init thread
     crawler_init_thread.start()
     
-    # Show Logging window and start Qt event loop
     if CONFIGS['ui_logging']:
+        # Run Flask app in its own thread, show Logging window and start Qt event loop
+        flask_thread = threading.Thread(target=run_flask_app, daemon=True)
+        flask_thread.start()
         logs.show()
-        sys.exit(app_qt.exec_())
\ No newline at end of file
+        sys.exit(app_qt.exec_())
+    else:
+        run_flask_app()
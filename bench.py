@@ -0,0 +1,379 @@
+# !/.venv/Scripts python3
+# -*- coding: utf-8 -*-
+
+"""Benchmarks of the guess hot path and the crawler parsers for Rhythm Game Music guessing game.
+
+    python bench.py                    # run everything, compare with the baseline
+    python bench.py --save             # run and save the results into the baseline
+    python bench.py --only submit wiki # run the benchmarks whose name contains a word
+    python bench.py --fixtures DIR     # parse the pages of another fixture archive (see fixtures.py)
+    python bench.py --from-cache       # parse the pages of the http cache
+
+Every benchmark is timed with `timeit`: the number of calls is calibrated
+to about 0.2 s per round, the median of the rounds per operation is kept.
+A benchmark slower than the baseline by more than the threshold is a
+regression and makes the run exit with 1. The crawler parsers run on the
+fixture archive committed with the repo, a benchmark skipped for lack of
+pages also fails the run unless `--allow-skip` is given.
+
+Author:      Imyuru_ (Imyuru_H)
+Version:     0.0.3
+Update Time: 25/06/25
+"""
+
+""" Update Logs:
+ - 0.0.1:
+     - Create this module, benchmark quest loading, alias resolution, row rendering, the parsers and /submit.
+ - 0.0.2:
+     - `submit_game` plays a fresh game with a fixed target every call.
+     - `--save` merges the results into the baseline instead of replacing it.
+ - 0.0.3:
+     - Parse the committed fixture archive by default, a skipped benchmark fails the run.
+"""
+
+__version__ = '0.0.3'
+__author__ = 'Imyuru_'
+
+# Copyright (c) 2025 Imyuru_. Licensed under MIT License.
+
+import os, sys, time, json
+import platform
+import statistics
+from timeit import Timer
+os.environ["PYTHONIOENCODING"] = "utf-8"
+os.environ.setdefault("MUSICGUESS_HEADLESS", "1")  # app.py is imported without Qt
+
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+BENCH_DIR = os.path.join(ROOT, '.bench')
+BASELINE_PATH = os.path.join(BENCH_DIR, 'baseline.json')
+LAST_PATH = os.path.join(BENCH_DIR, 'last.json')
+THRESHOLD = 0.2  # Share a benchmark may slow down before it counts as a regression
+ROUND_SECONDS = 0.2
+ROUNDS = 5
+
+
+class Skip(Exception):
+    """Raised by a benchmark setup which has nothing to run on"""
+
+
+_app = None
+
+def _load_app():
+    """Import app.py once, quiet and without background crawls"""
+    global _app
+    if _app is None:
+        import app
+        app.log_sink.listeners.clear()  # Keep the request logs out of the results, they still go to the file
+        app.CONFIGS['crawl_enrich'] = False
+        _app = app
+    return _app
+
+
+def _recorded_pages(fixtures_path:str|None) -> tuple[dict[str, str], dict[str, str]]:
+    """(fandom pages, moegirl pages) of a fixture archive, or of the http cache without one"""
+    import crawler
+    if fixtures_path is None:
+        return (crawler.Crawler.cache().pages(crawler.Config.START_URL_WIKI),
+                crawler.Crawler.cache().pages(crawler.Config.START_URL_MOE))
+
+    import fixtures
+    archive = fixtures.FixtureArchive(fixtures_path)
+    return archive.texts(crawler.Config.START_URL_WIKI), archive.texts(crawler.Config.START_URL_MOE)
+
+
+# Every benchmark takes the options and returns (function, operations per call)
+
+def bench_init_quest(options) -> tuple:
+    app = _load_app()
+    return app.init_quest, 1
+
+def bench_alias_resolve(options) -> tuple:
+    app = _load_app()
+    queries = [nick for nicks in app.song_store.nick_dict.values() for nick in nicks] + list(app.song_store.titles)
+    resolve = app.alias_index.resolve
+    def _run():
+        for query in queries:
+            resolve(query)
+    return _run, len(queries)
+
+def bench_alias_fuzzy(options) -> tuple:
+    app = _load_app()
+    queries = [title[:-1] for title in app.song_store.titles[:50] if len(title) > 3]  # Misspelled by one letter
+    fuzzy = app.alias_index.fuzzy
+    def _run():
+        for query in queries:
+            fuzzy(query)
+    return _run, len(queries)
+
+def bench_render_row(options) -> tuple:
+    app = _load_app()
+    import songstore
+    songs = [(title, app.song_store.get(title)) for title in app.song_store.titles]
+    def _run():
+        for title, song in songs:
+            songstore.render_row_html(songstore.render_row(title, song))
+    return _run, len(songs)
+
+def bench_render_response(options) -> tuple:
+    app = _load_app()
+    import songstore
+    songs = [(title, app.song_store.get(title)) for title in app.song_store.titles]
+    def _run():
+        for title, song in songs:
+            songstore.render_response(title, song)
+    return _run, len(songs)
+
+def _submit(payloads:list[dict], start=None) -> tuple:
+    """Post every payload to /submit, `start()` returns fields added to all of them on each call"""
+    client = _load_app().app.test_client()
+    def _run():
+        fields = start() if start is not None else {}
+        for payload in payloads:
+            payload = {**payload, **fields}
+            resp = client.post('/submit', json=payload)
+            if resp.status_code != 200:
+                raise RuntimeError(f"/submit answered {resp.status_code} to {payload}")
+    return _run, len(payloads)
+
+def bench_submit(options) -> tuple:
+    app = _load_app()
+    return _submit([{'title': title} for title in app.song_store.titles[:100]])
+
+def bench_submit_game(options) -> tuple:
+    app = _load_app()
+    # A new game every call, on a song never guessed, so every call times the same 100 wrong guesses
+    target = app.song_store.titles[-1]
+    start = lambda: {'session': app.game_engine.start(target)}
+    return _submit([{'title': title, 'html': True} for title in app.song_store.titles[:100]], start)
+
+def bench_wiki_parse_table_lst(options) -> tuple:
+    import crawler
+    from bs4 import BeautifulSoup
+    crawler_ = crawler.WikiCrawler()
+    tables = []
+    for html in options.wiki_pages.values():
+        try:
+            table = crawler_._get_song_data(BeautifulSoup(html, "lxml"))
+            crawler_._parse_table_lst(table)
+        except (AttributeError, KeyError, ValueError):
+            continue  # Not a song page
+        tables.append(table)
+    if not tables:
+        raise Skip("no recorded fandom song page")
+    def _run():
+        for table in tables:
+            crawler_._parse_table_lst(table)
+    return _run, len(tables)
+
+def _wiki_pages(options, parse) -> list[str]:
+    pages = []
+    for html in options.wiki_pages.values():
+        try:
+            parse(html)
+        except (AttributeError, KeyError, ValueError):
+            continue
+        pages.append(html)
+    if not pages:
+        raise Skip("no recorded fandom song page")
+    return pages
+
+def bench_wiki_parse_page_bs4(options) -> tuple:
+    import crawler
+    parse = crawler.WikiCrawler().parse_page_bs4
+    pages = _wiki_pages(options, parse)
+    def _run():
+        for html in pages:
+            parse(html)
+    return _run, len(pages)
+
+def bench_wiki_parse_page(options) -> tuple:
+    import crawler
+    parse = crawler.WikiCrawler().parse_page
+    pages = _wiki_pages(options, parse)
+    def _run():
+        for html in pages:
+            parse(html)
+    return _run, len(pages)
+
+def bench_moe_parse_song_data(options) -> tuple:
+    import crawler
+    from bs4 import BeautifulSoup
+    parse = crawler.MoeCrawler()._get_n_parse_song_data
+    soups = []
+    for html in options.moe_pages.values():
+        soup = BeautifulSoup(html, "lxml")
+        try:
+            parse(soup)
+        except (AttributeError, IndexError, KeyError, ValueError):
+            continue  # Layout the old parser can't read
+        soups.append(soup)
+    if not soups:
+        raise Skip("no recorded moegirl song list the old parser reads")
+    def _run():
+        for soup in soups:
+            parse(soup)
+    return _run, len(soups)
+
+def bench_moe_parse_song_list(options) -> tuple:
+    import crawler
+    pages = list(options.moe_pages.values())
+    if not pages:
+        raise Skip("no recorded moegirl song list")
+    def _run():
+        for html in pages:
+            crawler.parse_moe_song_list(html)
+    return _run, len(pages)
+
+
+BENCHMARKS = {name[len('bench_'):]: func for name, func in globals().items() if name.startswith('bench_')}
+
+
+def measure(func, operations:int, rounds:int = ROUNDS) -> dict:
+    """Seconds per operation of `func`, over `rounds` calibrated rounds"""
+    timer = Timer(func)
+    number, seconds = timer.autorange()
+    number = max(1, int(number * ROUND_SECONDS / max(seconds, 1e-9)))
+    times = [seconds / number / operations for seconds in timer.repeat(repeat=rounds, number=number)]
+    return {
+        'median' : statistics.median(times),
+        'min' : min(times),
+        'operations' : operations * number,
+    }
+
+
+def run(names:list[str], options) -> tuple[dict, dict]:
+    """(results, skipped) of the named benchmarks"""
+    results, skipped = {}, {}
+    for name in names:
+        try:
+            func, operations = BENCHMARKS[name](options)
+            func()  # Warm up caches and lazy imports
+        except Skip as e:
+            skipped[name] = str(e)
+            continue
+        results[name] = measure(func, operations, options.rounds)
+        print(f"  {name:<24} {_format_seconds(results[name]['median'])}/op", flush=True)
+    return results, skipped
+
+
+def compare(results:dict, baseline:dict) -> dict[str, float]:
+    """Current / baseline median of every benchmark both have"""
+    return {name: result['median'] / baseline[name]['median']
+            for name, result in results.items() if name in baseline and baseline[name]['median'] > 0}
+
+
+def _format_seconds(seconds:float) -> str:
+    for unit, scale in (('s', 1), ('ms', 1e-3), ('us', 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:8.3f} {unit}"
+    return f"{seconds / 1e-9:8.1f} ns"
+
+
+def _environment() -> dict:
+    return {
+        'python' : platform.python_version(),
+        'implementation' : platform.python_implementation(),
+        'machine' : platform.machine(),
+        'system' : platform.system(),
+        'processor' : platform.processor(),
+    }
+
+
+def _write_json(path:str, data:dict) -> None:
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def main(argv:list[str]|None = None) -> None:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="MusicGuess benchmarks")
+    parser.add_argument('--only', nargs='+', metavar='WORD', help="run the benchmarks whose name contains one of the words")
+    parser.add_argument('--fixtures', metavar='DIR', help="fixture archive with the pages to parse, "
+                                                          "default: the one committed with the repo")
+    parser.add_argument('--from-cache', action='store_true', help="parse the pages of the http cache instead")
+    parser.add_argument('--allow-skip', action='store_true', help="don't fail the run when a benchmark is skipped")
+    parser.add_argument('--baseline', default=BASELINE_PATH, help="baseline json to compare with")
+    parser.add_argument('--save', action='store_true', help="save the results as the new baseline")
+    parser.add_argument('--threshold', type=float, default=THRESHOLD, help="slowdown share counted as a regression")
+    parser.add_argument('--rounds', type=int, default=ROUNDS, help="timed rounds of each benchmark")
+    parser.add_argument('--list', action='store_true', help="list the benchmarks and exit")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        print('\n'.join(BENCHMARKS))
+        return
+
+    os.chdir(ROOT)  # The app finds its quest bank and static files from here
+    names = [name for name in BENCHMARKS if not args.only or any(word in name for word in args.only)]
+    if not names:
+        print(f"No benchmark matches {args.only}, see --list.")
+        sys.exit(2)
+    if args.from_cache:
+        args.wiki_pages, args.moe_pages = _recorded_pages(None)
+    else:
+        import fixtures
+        args.wiki_pages, args.moe_pages = _recorded_pages(args.fixtures or fixtures.DEFAULT_ARCHIVE)
+
+    print(f"Running {len(names)} benchmarks "
+          f"({len(args.wiki_pages)} fandom pages, {len(args.moe_pages)} moegirl pages):")
+    results, skipped = run(names, args)
+    report = {
+        'version' : 1,
+        'created' : time.strftime('%Y-%m-%d %H:%M:%S'),
+        'environment' : _environment(),
+        'results' : results,
+    }
+    _write_json(LAST_PATH, report)
+
+    for name, reason in skipped.items():
+        print(f"  {name:<24} SKIPPED: {reason}")
+
+    regressions = []
+    baseline = None
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline.get('environment') != report['environment']:
+            print("Baseline was recorded on another environment, the comparison is only indicative.")
+        ratios = compare(results, baseline['results'])
+        print(f"\nAgainst the baseline of {baseline['created']} (threshold {args.threshold:.0%}):")
+        if not ratios:
+            print("  No benchmark in common.")
+        for name, ratio in ratios.items():
+            status = ''
+            if ratio > 1 + args.threshold:
+                status = 'REGRESSION'
+                regressions.append(name)
+            elif ratio < 1 - args.threshold:
+                status = 'faster'
+            print(f"  {name:<24} {_format_seconds(baseline['results'][name]['median'])} -> "
+                  f"{_format_seconds(results[name]['median'])}  {ratio:5.2f}x  {status}")
+    elif not args.save:
+        print(f"\nNo baseline at {args.baseline}, save one with --save.")
+
+    if args.save:
+        # The benchmarks which didn't run keep their baseline
+        saved = {**report, 'results': {**(baseline['results'] if baseline else {}), **results}}
+        _write_json(args.baseline, saved)
+        print(f"\nBaseline saved to {args.baseline}: {len(results)} updated, "
+              f"{len(saved['results']) - len(results)} kept")
+
+    failed = False
+    if regressions and not args.save:
+        print(f"\n{len(regressions)} regression(s): {', '.join(regressions)}")
+        failed = True
+    if skipped and not args.allow_skip:
+        # A benchmark which didn't run can't flag its regressions
+        print(f"\n{len(skipped)} benchmark(s) skipped: {', '.join(skipped)}, pass --allow-skip to accept it")
+        failed = True
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
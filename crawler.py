@@ -4,8 +4,8 @@
 """ A crawler for Rhythm Game Music guessing game.
 
 Author:      Imyuru_ (Imyuru_H)
-Version:     0.0.5
-Update Time: 25/05/25
+Version:     0.2.0
+Update Time: 25/06/23
 """
 
 """ Update Logs:
@@ -20,22 +20,63 @@ Update Time: 25/05/25
      - Add lru_cache to optimize the crawling method.
  - 0.0.5:
      - Fix bugs.
+ - 0.0.6:
+     - Replace lru_cache with a persistent on-disk http cache shared by all crawlers.
+ - 0.0.7:
+     - Parse the moegirl song list once into a shared BPM table refreshed in background.
+ - 0.0.8:
+     - Fetch wiki and moegirl concurrently in PhiCrawler with a per-request deadline.
+ - 0.0.9:
+     - Add the `snapshot` command crawling every song of the quest bank into one file.
+ - 0.1.0:
+     - PhiCrawler can report the time of each source for request stage timing.
+ - 0.1.1:
+     - The http cache connection can be dropped in forked workers.
+ - 0.1.2:
+     - Parse fandom pages with a streaming lxml parser which stops after the infobox table.
+     - Add the `parse-bench` command comparing it with the BeautifulSoup parser on saved pages.
+ - 0.1.3:
+     - Build the BPM table with a single pass lxml parser finding the song tables by their headers.
+ - 0.1.4:
+     - Crawlers can use a pluggable transport, to record pages into fixtures or replay them offline.
+     - Add `--record`, `--replay`, `--stand-in` and `--cache` options pointing the crawl at fixtures.
+ - 0.1.5:
+     - The lxml fandom parser raises `PageParseError` on a page without a table.
+ - 0.1.6:
+     - Moegirl columns match their header names exactly, a table with two matching columns is an error.
+     - Add the `moe-headers` command showing the columns read from a recorded song list.
+ - 0.1.7:
+     - `--record` crawls with a cold in-memory cache so every page reaches the archive.
+ - 0.1.8:
+     - `--replay` crawls with a cold in-memory cache too, only the fixtures answer.
+ - 0.1.9:
+     - Moegirl rows keep a `<th>` title cell and skip the section rows spanning the table.
+     - A moegirl song table without any song is a `PageParseError`.
+ - 0.2.0:
+     - `parse-bench` reads the fandom pages of the committed fixture archive by default.
 """
 
-__version__ = '0.0.5'
+__version__ = '0.2.0'
 __author__ = 'Imyuru_'
 
 # Copyright (c) 2025 Imyuru_. Licensed under MIT License.
 
-import os, re, time
-from functools import lru_cache
+import os, re, io, sys, time, json
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed, wait
+from types import MappingProxyType
+from typing import TypedDict
 os.environ["PYTHONIOENCODING"] = "utf-8"
 
 import requests
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
 import bs4
 from bs4 import BeautifulSoup
+from lxml import etree
 from fake_useragent import UserAgent
-from urllib.parse import urljoin
+from urllib.parse import urljoin, urlsplit
 
 from timeit import repeat
 
@@ -49,15 +90,150 @@ class Config:
     }
     TIMEOUT = 10
     MAX_RETRY = 3
+    CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache', 'http_cache.sqlite3')
+    CACHE_MAX_BYTES = 64 * 1024**2  # Least recently used pages are evicted over this size
+    CACHE_MAX_AGE = 600  # Seconds a cached page is used without revalidation
+    DEADLINE = 5  # Seconds PhiCrawler waits for its sources before returning partial info
+    BPM_TABLE_TTL = 6 * 3600  # Seconds between two refreshes of the BPM table
+    BPM_OVERRIDES = {
+        "Another Me (Neutral Moon)" : "175",
+        "Another Me (D_AAN)" : "210",
+    }
+    # Header names of the moegirl song table columns, matched exactly (case and spaces ignored).
+    # Check them against a recorded page with `python crawler.py --replay DIR moe-headers`,
+    # `fixture_archive` holds a synthetic song list in the layout the parsers expect.
+    MOE_TITLE_HEADERS = ('曲名', '曲目', '歌曲', '歌曲名', 'title')
+    MOE_BPM_HEADERS = ('bpm',)
+
+class HttpCache:
+    """Persistent response cache keyed by url.
+    
+    Pages live in a small SQLite file so they survive restarts. Every entry
+    keeps its ETag / Last-Modified, stale entries are revalidated with a
+    conditional GET and a 304 only refreshes the entry.
+    """
+    def __init__(self, path:str = Config.CACHE_PATH, max_bytes:int = Config.CACHE_MAX_BYTES):
+        if os.path.dirname(path):  # Not ':memory:'
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        with self.lock, self.conn:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    url TEXT PRIMARY KEY,
+                    headers TEXT NOT NULL,
+                    encoding TEXT,
+                    body BLOB NOT NULL,
+                    size INTEGER NOT NULL,
+                    stored_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )""")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_accessed ON responses (accessed_at)")
+    
+    def get(self, url:str) -> dict|None:
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT headers, encoding, body, stored_at FROM responses WHERE url = ?", (url,)
+            ).fetchone()
+            if row is None:
+                return None
+            with self.conn:
+                self.conn.execute("UPDATE responses SET accessed_at = ? WHERE url = ?", (time.time(), url))
+        headers, encoding, body, stored_at = row
+        return {'headers': CaseInsensitiveDict(json.loads(headers)), 'encoding': encoding, 'body': body, 'stored_at': stored_at}
+    
+    def put(self, url:str, resp:requests.Response) -> None:
+        now = time.time()
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (url, json.dumps(dict(resp.headers)), resp.encoding, resp.content, len(resp.content), now, now)
+            )
+            self._evict()
+    
+    def refresh(self, url:str) -> None:
+        """Mark an entry fresh again after a 304"""
+        now = time.time()
+        with self.lock, self.conn:
+            self.conn.execute("UPDATE responses SET stored_at = ?, accessed_at = ? WHERE url = ?", (now, now, url))
+    
+    def _evict(self) -> None:
+        """Drop least recently used entries until the cache fits (lock held)"""
+        total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for url, size in self.conn.execute("SELECT url, size FROM responses ORDER BY accessed_at").fetchall():
+            self.conn.execute("DELETE FROM responses WHERE url = ?", (url,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+    
+    def pages(self, prefix:str) -> dict[str, str]:
+        """Saved page text of every url starting with `prefix`"""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT url, encoding, body FROM responses WHERE substr(url, 1, ?) = ?", (len(prefix), prefix)
+            ).fetchall()
+        return {url: body.decode(encoding or 'utf-8', errors='replace') for url, encoding, body in rows}
+    
+    @staticmethod
+    def to_response(url:str, entry:dict) -> requests.Response:
+        resp = requests.Response()
+        resp.url = url
+        resp.status_code = 200
+        resp.headers = CaseInsensitiveDict(entry['headers'])
+        resp.encoding = entry['encoding']
+        resp._content = entry['body']
+        return resp
 
 class Crawler:
+    _cache:HttpCache|None = None
+    _cache_lock = threading.Lock()
+    # Sends the requests of every crawler created afterwards, None for the network
+    transport:BaseAdapter|None = None
+    
     def __init__(self):
         self.session = requests.Session()
         self.session.headers.update(Config.HEADERS)
+        if Crawler.transport is not None:
+            self.session.mount('http://', Crawler.transport)
+            self.session.mount('https://', Crawler.transport)
         self.visited_urls = set()
     
-    @lru_cache(maxsize=None)
+    @classmethod
+    def use_transport(cls, transport:BaseAdapter|None) -> None:
+        """Send the requests of new crawlers through `transport`, e.g. a `fixtures.FixtureAdapter`"""
+        Crawler.transport = transport
+    
+    @classmethod
+    def cache(cls) -> HttpCache:
+        """The http cache shared by every crawler of the process"""
+        with Crawler._cache_lock:
+            if Crawler._cache is None:
+                Crawler._cache = HttpCache(Config.CACHE_PATH)
+        return Crawler._cache
+    
+    @classmethod
+    def reset_cache(cls) -> None:
+        """Forget the shared http cache, a forked process must open its own connection"""
+        with Crawler._cache_lock:
+            Crawler._cache = None
+    
     def _fetch(self, url:str, **kwargs) -> requests.Response:
+        cache = self.cache()
+        entry = cache.get(url)
+        if entry is not None:
+            if time.time() - entry['stored_at'] < Config.CACHE_MAX_AGE:
+                return HttpCache.to_response(url, entry)
+            # Stale, ask the server whether it changed
+            conditional = {}
+            if 'ETag' in entry['headers']:
+                conditional['If-None-Match'] = entry['headers']['ETag']
+            if 'Last-Modified' in entry['headers']:
+                conditional['If-Modified-Since'] = entry['headers']['Last-Modified']
+            kwargs['headers'] = {**conditional, **kwargs.get('headers', {})}
+        
         for attempt in range(Config.MAX_RETRY):
             try:
                 resp = self.session.get(
@@ -66,6 +242,10 @@ class Crawler:
                     **kwargs
                 )
                 resp.raise_for_status()  # Check HTTP errors
+                if resp.status_code == 304 and entry is not None:
+                    cache.refresh(url)
+                    return HttpCache.to_response(url, entry)
+                cache.put(url, resp)
                 return resp
             except Exception as e:
                 print(f"Fetch failed ({attempt+1}/{Config.MAX_RETRY}): {url} - {str(e)}")
@@ -77,6 +257,207 @@ class Crawler:
         soup = BeautifulSoup(html.text, "lxml")
         return soup
 
+# Info of a song parsed from its fandom page
+WikiInfo = TypedDict('WikiInfo', {
+    'pack' : str,
+    'difficulty' : list[str],
+    'level' : list[str],
+    'note count' : list[str],
+    'artist' : str,
+    'illustration' : str,
+    'duration' : str,
+    'chart design' : list[str]|str|None,
+})
+
+# bs4 leaves the strings inside these tags out of get_text(), so does the lxml parser
+_NON_TEXT_TAGS = frozenset(('script', 'style', 'template', 'rt', 'rp'))
+_TOKEN_SPLIT_PATTERN = re.compile(r"[\n,]")
+
+
+class _TokenIndex(list):
+    """Table tokens with the first position of every token, found in one pass.
+    
+    `index` and `in` are dict lookups instead of list scans, they give the
+    same answers as on a plain list.
+    """
+    def __init__(self, tokens:list[str]):
+        super().__init__(tokens)
+        self.first:dict[str, int] = {}
+        for i, token in enumerate(tokens):
+            self.first.setdefault(token, i)
+    
+    def index(self, token, *args) -> int:
+        if args:
+            return super().index(token, *args)
+        try:
+            return self.first[token]
+        except KeyError:
+            raise ValueError(f"{token!r} is not in list") from None
+    
+    def __contains__(self, token) -> bool:
+        return token in self.first
+
+
+class PageParseError(ValueError):
+    """A crawled page doesn't have the layout its parser expects"""
+
+
+def _first_table(html:str) -> etree._Element:
+    """The first <table> of a page, the rest of the page is never parsed"""
+    table = None
+    events = etree.iterparse(io.BytesIO(html.encode('utf-8')), events=('start', 'end'),
+                             html=True, encoding='utf-8')
+    for event, element in events:
+        if event == 'start':
+            if table is None and element.tag == 'table':
+                table = element
+        elif element is table:
+            return table
+    if table is None:
+        raise PageParseError("No table in the page")
+    return table
+
+
+def _table_strings(element:etree._Element):
+    """Text of a table in document order, like bs4's `_all_strings`"""
+    if element.text:
+        yield element.text
+    for child in element:
+        if isinstance(child.tag, str) and child.tag not in _NON_TEXT_TAGS:
+            yield from _table_strings(child)
+        if child.tail:
+            yield child.tail
+
+
+def _cell_text(cell:etree._Element) -> str:
+    return ''.join(_table_strings(cell)).strip()
+
+
+def _span(cell:etree._Element, name:str) -> int:
+    value = cell.get(name, '1').strip()
+    return max(int(value), 1) if value.isdigit() else 1
+
+
+def _table_grid(table:etree._Element) -> list[list[etree._Element]]:
+    """Rows of a table with rowspan/colspan cells repeated in every slot they cover"""
+    grid = []
+    pending:dict[int, tuple[etree._Element, int]] = {}  # column -> (cell, rows left)
+    for row in table.xpath('./tr | ./thead/tr | ./tbody/tr | ./tfoot/tr'):
+        cells = iter(row.xpath('./th | ./td'))
+        slots = []
+        column = 0
+        while True:
+            if column in pending:
+                cell, left = pending[column]
+                slots.append(cell)
+                if left > 1:
+                    pending[column] = (cell, left - 1)
+                else:
+                    del pending[column]
+                column += 1
+                continue
+            cell = next(cells, None)
+            if cell is None:
+                if not any(col >= column for col in pending):
+                    break
+                slots.append(None)
+                column += 1
+                continue
+            rowspan, colspan = _span(cell, 'rowspan'), _span(cell, 'colspan')
+            for _ in range(colspan):
+                slots.append(cell)
+                if rowspan > 1:
+                    pending[column] = (cell, rowspan - 1)
+                column += 1
+        grid.append(slots)
+    return grid
+
+
+def _header_name(text:str) -> str:
+    return ''.join(text.split()).casefold()
+
+
+def _find_column(headers:list[tuple[str, ...]], names:tuple[str, ...]) -> int|None:
+    """The column one of whose header names is exactly one of `names`, None if there is none.
+    
+    Raises:
+        PageParseError: more than one column matches, the table can't be read safely
+    """
+    names = {_header_name(name) for name in names}
+    columns = [i for i, header in enumerate(headers) if names.intersection(header)]
+    if len(columns) > 1:
+        raise PageParseError(f"Moegirl song table with several {sorted(names)} columns, headers: {headers}")
+    return columns[0] if columns else None
+
+
+def parse_moe_song_list(html:str, report:list|None = None) -> dict[str, str]:
+    """Song -> bpm of every song table of the moegirl song list.
+    
+    The page is parsed once with lxml, a table counts as a song table when
+    one of its header columns is BPM and it is read by its header names,
+    not by its position on the page.
+    
+    Args:
+        html: the song list page
+        report: filled with (headers, title column, bpm column, songs) of every song table
+    
+    Raises:
+        PageParseError: no song table, a song table without exactly one title column or without songs
+    """
+    bpm_dict = {}
+    tables = 0
+    events = etree.iterparse(io.BytesIO(html.encode('utf-8')), events=('end',), tag='table',
+                             html=True, encoding='utf-8')
+    for _, table in events:
+        grid = _table_grid(table)
+        # Leading rows made of <th> only are the header, a column keeps the names of every header row
+        header_rows = 0
+        while header_rows < len(grid) and all(cell is not None and cell.tag == 'th' for cell in grid[header_rows]):
+            header_rows += 1
+        if not header_rows:
+            continue
+        width = max(len(row) for row in grid[:header_rows])
+        headers = []
+        for column in range(width):
+            names = []
+            for row in grid[:header_rows]:
+                cell = row[column] if column < len(row) else None
+                name = _header_name(_cell_text(cell)) if cell is not None else ''
+                if name and name not in names:
+                    names.append(name)
+            headers.append(tuple(names))
+        
+        bpm_column = _find_column(headers, Config.MOE_BPM_HEADERS)
+        if bpm_column is None:
+            continue
+        title_column = _find_column(headers, Config.MOE_TITLE_HEADERS)
+        if title_column is None:
+            raise PageParseError(f"Moegirl song table without a title column, headers: {headers}")
+        tables += 1
+        
+        songs = 0
+        for row in grid[header_rows:]:
+            if len(row) <= max(title_column, bpm_column):
+                continue
+            title_cell, bpm_cell = row[title_column], row[bpm_column]
+            # Section rows span both columns, repeated header rows have no bpm value. A title may be a <th>
+            if title_cell is None or bpm_cell is None or title_cell is bpm_cell or bpm_cell.tag != 'td':
+                continue
+            title, bpm = _cell_text(title_cell), _cell_text(bpm_cell)
+            if title and bpm:
+                bpm_dict[title] = bpm
+                songs += 1
+        if report is not None:
+            report.append((headers, title_column, bpm_column, songs))
+        if not songs:
+            raise PageParseError(f"Moegirl song table without songs, headers: {headers}")
+        table.clear()
+    
+    if not tables:
+        raise PageParseError("Moegirl song list has no table with a BPM column, the page layout changed")
+    return bpm_dict
+
+
 class WikiCrawler(Crawler):
     def __init__(self):
         super().__init__()
@@ -86,7 +467,15 @@ class WikiCrawler(Crawler):
         table = table.get_text(',')
         return table
     
-    def _parse_table_lst(self, table:str) -> dict:
+    def _parse_table_lst(self, table:str) -> WikiInfo:
+        tb_lst = table.split('\n')
+        tb_lst = [item for sublist in [i.split(',') for i in tb_lst] for item in sublist]
+        # del all umpty elements in the list
+        tb_lst = list(filter(None, tb_lst))
+        
+        return self._parse_tokens(tb_lst)
+    
+    def _parse_tokens(self, tb_lst:list[str]) -> WikiInfo:
         def _get_chart_design(table: list, if_at: bool = False) -> list:
             """
             从表格数据中提取图表设计信息
@@ -175,11 +564,6 @@ class WikiCrawler(Crawler):
             # 过滤掉None值
             return list(filter(None, result)) if isinstance(result, list) else result
 
-        tb_lst = table.split('\n')
-        tb_lst = [item for sublist in [i.split(',') for i in tb_lst] for item in sublist]
-        # del all umpty elements in the list
-        tb_lst = list(filter(None, tb_lst))
-
         # if have AT difficulty then True, if not then False
         if_at = True if tb_lst.index('Difficulty') + 1 - tb_lst.index('Level') == 4 else False
         
@@ -206,13 +590,27 @@ class WikiCrawler(Crawler):
         
         return info_dict
     
+    def parse_page(self, html:str) -> WikiInfo:
+        """Parse a song page in one pass: stream it with lxml until the first
+        table closes, split its strings into tokens and look every label up
+        in a token index instead of scanning the list.
+        """
+        tokens = [token for string in _table_strings(_first_table(html))
+                  for token in _TOKEN_SPLIT_PATTERN.split(string) if token]
+        return self._parse_tokens(_TokenIndex(tokens))
+    
+    def parse_page_bs4(self, html:str) -> WikiInfo:
+        """The BeautifulSoup parser, kept as the reference of `parse_page`"""
+        return self._parse_table_lst(self._get_song_data(BeautifulSoup(html, "lxml")))
+    
+    @staticmethod
+    def url(song:str) -> str:
+        return f"{Config.START_URL_WIKI}{song.replace(' ','_')}"
+    
     def run(self, song:str) -> tuple[dict,float]:
         start_time = time.time()
-        song = song.replace(' ','_')
-        resp = self._fetch(f"{Config.START_URL_WIKI}{song}")
-        data = self._parse_html(resp)
-        table = self._get_song_data(data)
-        info = self._parse_table_lst(table)
+        resp = self._fetch(self.url(song))
+        info = self.parse_page(resp.text)
         duration = time.time() - start_time
         
         return info, duration
@@ -222,6 +620,7 @@ class MoeCrawler(Crawler):
         super().__init__()
     
     def _get_n_parse_song_data(self, html:BeautifulSoup) -> dict:
+        """The former position based BeautifulSoup parser, see `parse_moe_song_list`"""
         HTML_TAG_PATTERN = re.compile(r'<.*?>')
         _VALID_FORMAT_PATTERN = re.compile(r'^(\d+)\s+\((\d+\.\d+)\)$')
         
@@ -274,18 +673,118 @@ class MoeCrawler(Crawler):
         
         return bpm_dict
     
+    def build_table(self) -> dict[str, str]:
+        """Fetch and parse the whole song list into a song -> bpm dict"""
+        resp = self._fetch(Config.START_URL_MOE)
+        bpm_dict = parse_moe_song_list(resp.text)
+        bpm_dict.update(Config.BPM_OVERRIDES)
+        return bpm_dict
+    
     def run(self, song:str) -> tuple[str,float]:
+        """Read the bpm from the shared table, '' while it is not built yet"""
         start_time = time.time()
-        resp = self._fetch(Config.START_URL_MOE)
-        data = self._parse_html(resp)
-        bpm_dict = self._get_n_parse_song_data(data)
-        bpm = "175" if song == "Another Me (Neutral Moon)" else "210" if song == "Another Me (D_AAN)" else bpm_dict[song]
+        BPM_TABLE.start()
+        bpm = BPM_TABLE.get(song, '')
         duration = time.time() - start_time
         
         return bpm, duration
 
+class BpmTable:
+    """Process-wide song -> bpm table built from the moegirl song list.
+    
+    The page is parsed once in a background thread and refreshed every
+    `Config.BPM_TABLE_TTL` seconds. A refresh builds a new read-only mapping
+    and swaps the reference, so readers never lock and never parse.
+    """
+    def __init__(self, ttl:float = Config.BPM_TABLE_TTL):
+        self.ttl = ttl
+        self.table:MappingProxyType = MappingProxyType({})
+        self.built_at:float = 0
+        self._start_lock = threading.Lock()
+        self._thread:threading.Thread|None = None
+        self._ready = threading.Event()
+    
+    @property
+    def ready(self) -> bool:
+        return self._ready.is_set()
+    
+    def get(self, song:str, default=None) -> str|None:
+        return self.table.get(song, default)
+    
+    def refresh(self) -> float:
+        """Rebuild the table now and swap it in, returns the duration"""
+        start_time = time.time()
+        table = MappingProxyType(MoeCrawler().build_table())
+        self.table, self.built_at = table, time.time()
+        self._ready.set()
+        return self.built_at - start_time
+    
+    def wait(self, timeout:float|None = None) -> bool:
+        """Block until the first table is built"""
+        return self._ready.wait(timeout)
+    
+    def start(self) -> None:
+        """Start the refresh thread once, later calls do nothing"""
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._refresh_loop, name='bpm-table', daemon=True)
+                self._thread.start()
+    
+    def _refresh_loop(self) -> None:
+        while True:
+            try:
+                self.refresh()
+                delay = self.ttl
+            except Exception as e:
+                # Keep the old table and retry sooner
+                print(f"BPM table refresh failed: {str(e)}")
+                delay = min(self.ttl, 60)
+            time.sleep(delay)
+
+BPM_TABLE = BpmTable()
+
 class PhiCrawler:
-    def run(self, song:str) -> tuple[dict,float]:
+    """Crawl the wiki info and the bpm of a song.
+    
+    In concurrent mode both sources are fetched in parallel on a shared
+    thread pool and `run` returns after at most `deadline` seconds. A source
+    that is not done by then is left out of the info (e.g. no 'bpm'), it
+    keeps running in the pool and its page still lands in the http cache.
+    """
+    def __init__(self, concurrent:bool = True, deadline:float = Config.DEADLINE, max_workers:int = 4):
+        self.concurrent = concurrent
+        self.deadline = deadline
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='phi-crawler') if concurrent else None
+    
+    def run(self, song:str, deadline:float|None = None, timings:dict|None = None) -> tuple[dict,float]:
+        """
+        Args:
+            song: song title
+            deadline: overrides the deadline of this crawler
+            timings: filled with the seconds spent by each finished source ('wiki', 'moe')
+        """
+        if not self.concurrent:
+            return self._run_sequential(song, timings)
+        
+        start_time = time.time()
+        wiki = self.pool.submit(WikiCrawler().run, song)
+        moe = self.pool.submit(MoeCrawler().run, song)
+        done, _ = wait((wiki, moe), timeout=self.deadline if deadline is None else deadline)
+        
+        info, time_wiki, time_moe = {}, None, None
+        if wiki in done:
+            info, time_wiki = wiki.result()  # Crawl errors of the main source are raised as before
+        if moe in done and moe.exception() is None:
+            info['bpm'], time_moe = moe.result()
+        duration = time.time() - start_time
+        
+        if timings is not None:
+            timings.update({name: t for name, t in (('wiki', time_wiki), ('moe', time_moe)) if t is not None})
+        return info, duration
+    
+    def _run_sequential(self, song:str, timings:dict|None = None) -> tuple[dict,float]:
         info_crawler = WikiCrawler()
         bpm_crawler = MoeCrawler()
         
@@ -293,11 +792,230 @@ class PhiCrawler:
         info['bpm'], time_moe = bpm_crawler.run(song)
         
         duration = time_wiki + time_moe
+        if timings is not None:
+            timings.update(wiki=time_wiki, moe=time_moe)
         
         return info, duration
 
 
+class RateLimiter:
+    """Thread-safe limiter letting at most `rate` calls start per second"""
+    def __init__(self, rate:float):
+        self.interval = 1 / rate if rate > 0 else 0
+        self.lock = threading.Lock()
+        self.next_time = time.monotonic()
+    
+    def acquire(self) -> None:
+        with self.lock:
+            now = time.monotonic()
+            wait_time = self.next_time - now
+            self.next_time = max(now, self.next_time) + self.interval
+        if wait_time > 0:
+            time.sleep(wait_time)
+
+def _parse_wiki_page(html:str) -> dict:
+    """Parse one fandom song page, runs in a worker process"""
+    return WikiCrawler().parse_page(html)
+
+def build_snapshot(titles:list[str], workers:int = 8, rate:float = 4, processes:int|None = None) -> dict:
+    """Crawl every song page into one snapshot dict.
+    
+    Pages are fetched by a bounded thread pool behind a polite rate limiter
+    and parsed in a process pool as soon as they arrive.
+    
+    Args:
+        titles: song titles to crawl
+        workers: max concurrent http requests
+        rate: max requests started per second
+        processes: parser processes, None for the cpu count
+    
+    Returns:
+        {'version', 'built_at', 'songs': {title: info}, 'failed': {title: error}}
+    """
+    limiter = RateLimiter(rate)
+    
+    def _fetch_page(title:str) -> str:
+        limiter.acquire()
+        return WikiCrawler()._fetch(WikiCrawler.url(title)).text
+    
+    songs, failed = {}, {}
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='snapshot-fetch') as fetch_pool, \
+         ProcessPoolExecutor(max_workers=processes) as parse_pool:
+        fetches = {fetch_pool.submit(_fetch_page, title): title for title in titles}
+        parses = {}
+        for future in as_completed(fetches):
+            title = fetches[future]
+            try:
+                parses[parse_pool.submit(_parse_wiki_page, future.result())] = title
+            except Exception as e:
+                failed[title] = f"fetch: {str(e)}"
+        for future in as_completed(parses):
+            title = parses[future]
+            try:
+                songs[title] = future.result()
+            except Exception as e:
+                failed[title] = f"parse: {type(e).__name__} {str(e)}"
+    
+    try:
+        BPM_TABLE.refresh()
+        for title, info in songs.items():
+            info['bpm'] = BPM_TABLE.get(title, '')
+    except Exception as e:
+        print(f"BPM table build failed, snapshot has no bpm: {str(e)}")
+    
+    return {
+        'version' : 1,
+        'built_at' : time.strftime('%Y-%m-%d %H:%M:%S'),
+        'songs' : {title: songs[title] for title in titles if title in songs},
+        'failed' : failed,
+    }
+
+def use_stand_in(base_url:str) -> None:
+    """Point the crawlers at a `fixtures.StandInServer`, which finds the pages by path"""
+    base_url = base_url.rstrip('/')
+    for name in ('START_URL_MOE', 'START_URL_WIKI'):
+        parts = urlsplit(getattr(Config, name))
+        setattr(Config, name, f"{base_url}{parts.path}" + (f"?{parts.query}" if parts.query else ''))
+
+def main(argv:list[str]|None = None) -> None:
+    import argparse
+    import songstore
+    
+    parser = argparse.ArgumentParser(description="Phigros song crawler")
+    fixture_group = parser.add_mutually_exclusive_group()
+    fixture_group.add_argument('--record', metavar='DIR', help="save every fetched page into a fixture archive, "
+                                                               "with a cold cache")
+    fixture_group.add_argument('--replay', metavar='DIR', help="answer every request from a fixture archive, offline, "
+                                                               "with a cold cache")
+    parser.add_argument('--stand-in', metavar='URL', help="crawl a local stand-in server instead of the real sites")
+    parser.add_argument('--cache', metavar='PATH', help="http cache file, ':memory:' for a cold cache")
+    subparsers = parser.add_subparsers(dest='command')
+    
+    song_parser = subparsers.add_parser('song', help="crawl one song and print its info")
+    song_parser.add_argument('title')
+    
+    snapshot_parser = subparsers.add_parser('snapshot', help="crawl every song of the quest bank into a snapshot file")
+    snapshot_parser.add_argument('-o', '--output', default=songstore.SNAPSHOT_PATH)
+    snapshot_parser.add_argument('-w', '--workers', type=int, default=8, help="max concurrent requests")
+    snapshot_parser.add_argument('-r', '--rate', type=float, default=4, help="max requests per second")
+    snapshot_parser.add_argument('-p', '--processes', type=int, default=None, help="parser processes")
+    
+    bench_parser = subparsers.add_parser('parse-bench', help="compare the lxml and bs4 fandom parsers on saved pages")
+    bench_parser.add_argument('pages', nargs='*', help="saved html files, default: the fandom pages of a fixture archive")
+    bench_parser.add_argument('--fixtures', metavar='DIR', default=None,
+                              help="fixture archive, default: the one committed with the repo")
+    bench_parser.add_argument('--from-cache', action='store_true', help="parse the fandom pages in the http cache")
+    bench_parser.add_argument('-n', '--number', type=int, default=5, help="parses of each page per round")
+    
+    subparsers.add_parser('moe-headers', help="show the columns read from the moegirl song list, "
+                                              "compare with the old parser")
+    
+    args = parser.parse_args(argv)
+    
+    # Pages of the persistent cache would skip the archive, and replayed pages would land in it
+    if args.record or args.replay:
+        if args.cache and args.cache != ':memory:':
+            parser.error("--record needs a cold cache, cached pages are never fetched nor recorded" if args.record
+                         else "--replay needs a cold cache, cached pages would be answered instead of the fixtures")
+        args.cache = ':memory:'
+    if args.cache:
+        Config.CACHE_PATH = args.cache
+    if args.stand_in:
+        use_stand_in(args.stand_in)
+    if args.record or args.replay:
+        import fixtures
+        archive = fixtures.FixtureArchive(args.record or args.replay)
+        Crawler.use_transport(fixtures.FixtureAdapter(archive, 'record' if args.record else 'replay'))
+    
+    if args.command == 'moe-headers':
+        from html import unescape
+        resp = MoeCrawler()._fetch(Config.START_URL_MOE)
+        report = []
+        bpm_dict = parse_moe_song_list(resp.text, report)
+        for headers, title_column, bpm_column, songs in report:
+            print(f"{songs:>4} songs, title: {headers[title_column]}, bpm: {headers[bpm_column]}")
+            print(f"      headers: {headers}")
+        try:
+            expected = MoeCrawler()._get_n_parse_song_data(BeautifulSoup(resp.text, "lxml"))
+        except (AttributeError, IndexError, KeyError, ValueError) as e:
+            print(f"{len(bpm_dict)} songs, the old parser can't read the page: {type(e).__name__} {str(e)}")
+            sys.exit(0)
+        # The old parser keeps the html entities of the markup and the songs without bpm
+        expected = {unescape(title): unescape(bpm) for title, bpm in expected.items() if bpm}
+        differ = sorted(title for title in expected.keys() | bpm_dict.keys() if expected.get(title) != bpm_dict.get(title))
+        print(f"{len(bpm_dict)} songs, {len(expected)} by the old parser, {len(differ)} differ")
+        for title in differ[:20]:
+            print(f" - {title}: {expected.get(title)} / {bpm_dict.get(title)}")
+        sys.exit(1 if differ else 0)
+    
+    elif args.command == 'parse-bench':
+        if args.pages:
+            pages = {}
+            for path in args.pages:
+                with open(path, encoding='utf-8') as f:
+                    pages[path] = f.read()
+        elif args.from_cache:
+            pages = Crawler.cache().pages(Config.START_URL_WIKI)
+        else:
+            import fixtures
+            pages = fixtures.FixtureArchive(args.fixtures or fixtures.DEFAULT_ARCHIVE).texts(Config.START_URL_WIKI)
+        if not pages:
+            print("No saved page to parse, pass html files or a fixture archive with fandom pages.")
+            sys.exit(1)
+        
+        crawler = WikiCrawler()
+        mismatched = []
+        compared = 0
+        for name, html in pages.items():
+            try:
+                expected = crawler.parse_page_bs4(html)
+            except (AttributeError, KeyError, ValueError):
+                continue  # Not a song page, bs4 raises AttributeError when there is no table
+            compared += 1
+            try:
+                if crawler.parse_page(html) != expected:
+                    mismatched.append(name)
+            except (KeyError, ValueError):
+                mismatched.append(name)
+        
+        timings = {}
+        for parser_name, parse in (('bs4', crawler.parse_page_bs4), ('lxml', crawler.parse_page)):
+            def _parse_all():
+                for html in pages.values():
+                    try:
+                        parse(html)
+                    except (AttributeError, KeyError, ValueError):
+                        pass
+            timings[parser_name] = min(repeat(_parse_all, number=args.number, repeat=3)) / args.number / len(pages)
+        
+        print(f"{len(pages)} pages, {compared} song pages compared, {len(mismatched)} mismatched")
+        for name in mismatched:
+            print(f" - {name}")
+        for parser_name, seconds in timings.items():
+            print(f"{parser_name:>5}: {seconds*1000:.3f} ms/page")
+        print(f"speedup: {timings['bs4'] / timings['lxml']:.1f}x")
+        sys.exit(1 if mismatched or not compared else 0)
+    
+    elif args.command == 'snapshot':
+        start_time = time.time()
+        titles = songstore.SongStore(songstore.read_quest_bank()).titles
+        snapshot = build_snapshot(titles, args.workers, args.rate, args.processes)
+        
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        tmp_path = f"{args.output}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(snapshot, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp_path, args.output)
+        
+        print(f"Snapshot: {len(snapshot['songs'])}/{len(titles)} songs -> {args.output}, "
+              f"{len(snapshot['failed'])} failed, {time.time() - start_time:.2f} seconds")
+        for title, error in snapshot['failed'].items():
+            print(f" - {title}: {error}")
+    else:
+        info, duration = PhiCrawler().run(getattr(args, 'title', 'Another Me (Neutral Moon)'))
+        print(info)
+
+
 if __name__ == "__main__":
-    info, duration = PhiCrawler().run('Another Me (Neutral Moon)')
-    print(info)
+    main()
     
\ No newline at end of file
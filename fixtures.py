@@ -0,0 +1,313 @@
+# !/.venv/Scripts python3
+# -*- coding: utf-8 -*-
+
+"""Recorded http fixtures for the crawlers of Rhythm Game Music guessing game.
+
+A `FixtureAdapter` is a requests transport. In record mode it fetches the
+real page and saves the response into a `FixtureArchive`, in replay mode
+it answers from the archive and never touches the network.
+
+`StandInServer` serves an archive over local http with configurable
+latency and injected errors, so crawl concurrency, retries and caching can
+be load-tested offline:
+
+    python fixtures.py serve fixtures/ --latency 0.2 --error-rate 0.1
+    python crawler.py --stand-in http://127.0.0.1:8765 snapshot
+
+`DEFAULT_ARCHIVE` is committed with the repo, synthetic fandom song pages
+and moegirl song list for the parser checks and benchmarks.
+
+Author:      Imyuru_ (Imyuru_H)
+Version:     0.0.3
+Update Time: 25/06/25
+"""
+
+""" Update Logs:
+ - 0.0.1:
+     - Create this module, add the fixture archive, record/replay transport and stand-in server.
+ - 0.0.2:
+     - Record mode asks for full pages and only keeps successful answers and redirects.
+ - 0.0.3:
+     - Add `DEFAULT_ARCHIVE`, the fixture pages committed with the repo, and `FixtureArchive.texts`.
+"""
+
+__version__ = '0.0.3'
+__author__ = 'Imyuru_'
+
+# Copyright (c) 2025 Imyuru_. Licensed under MIT License.
+
+import os
+import json
+import time
+import random
+import hashlib
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+
+DEFAULT_ARCHIVE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixture_archive')
+
+# Dropped while recording, the archive needs the page and not a 304
+_CONDITIONAL_HEADERS = ('If-None-Match', 'If-Modified-Since')
+_REDIRECT_STATUSES = frozenset((301, 302, 303, 307, 308))
+# Headers which describe the recorded transfer, not the page
+_HOP_HEADERS = frozenset(('connection', 'keep-alive', 'transfer-encoding', 'content-encoding', 'content-length'))
+
+
+def _local_key(url:str) -> str:
+    """Path and query of a url, how the stand-in server finds a page"""
+    parts = urlsplit(url)
+    return f"{parts.path}?{parts.query}" if parts.query else parts.path
+
+
+class FixtureArchive:
+    """Recorded responses in a folder: `index.json` plus one body file per url"""
+    def __init__(self, path:str):
+        self.path = path
+        self.lock = threading.Lock()
+        self.index:dict[str, dict] = {}
+        index_path = os.path.join(path, 'index.json')
+        if os.path.exists(index_path):
+            with open(index_path, encoding='utf-8') as f:
+                self.index = json.load(f)
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def __contains__(self, url:str) -> bool:
+        return url in self.index
+
+    def get(self, url:str) -> tuple[dict, bytes]|None:
+        """(meta, body) of a recorded url"""
+        meta = self.index.get(url)
+        if meta is None:
+            return None
+        with open(os.path.join(self.path, meta['body']), 'rb') as f:
+            return meta, f.read()
+
+    def save(self, url:str, resp:requests.Response) -> None:
+        body_name = f"{hashlib.sha1(url.encode()).hexdigest()}.bin"
+        meta = {
+            'status' : resp.status_code,
+            'reason' : resp.reason,
+            'headers' : {key: value for key, value in resp.headers.items() if key.lower() not in _HOP_HEADERS},
+            'encoding' : resp.encoding,
+            'body' : body_name,
+            'recorded_at' : time.time(),
+        }
+        with self.lock:
+            os.makedirs(self.path, exist_ok=True)
+            with open(os.path.join(self.path, body_name), 'wb') as f:
+                f.write(resp.content)
+            self.index[url] = meta
+            tmp_path = os.path.join(self.path, f"index.json.{os.getpid()}.tmp")
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.index, f, ensure_ascii=False, indent=1)
+            os.replace(tmp_path, os.path.join(self.path, 'index.json'))
+
+    def pages(self) -> dict[str, str]:
+        """Local key -> url of every recorded page"""
+        return {_local_key(url): url for url in self.index}
+
+    def texts(self, base_url:str) -> dict[str, str]:
+        """Url -> text of the recorded 200 pages under the path of `base_url`.
+
+        Matched by path, so archives recorded through a stand-in server work too.
+        """
+        base_path = urlsplit(base_url).path
+        texts = {}
+        for url, meta in self.index.items():
+            if meta['status'] == 200 and urlsplit(url).path.startswith(base_path):
+                _, body = self.get(url)
+                texts[url] = body.decode(meta['encoding'] or 'utf-8', errors='replace')
+        return texts
+
+
+class FixtureAdapter(BaseAdapter):
+    """requests transport recording into or replaying from a `FixtureArchive`.
+
+    Replaying a url which was never recorded raises `requests.ConnectionError`,
+    like a network failure would.
+
+    Recording drops the conditional headers, so a stale cache entry still
+    gets the whole page, and only keeps 2xx answers and redirects: an error
+    which the retries don't get past never replaces a good page. Pages the
+    http cache answers without a request can't be recorded, record with a
+    cold cache (`crawler.py --record` uses one).
+    """
+    def __init__(self, archive:FixtureArchive, mode:str = 'replay'):
+        super().__init__()
+        if mode not in ('record', 'replay'):
+            raise ValueError(f"Unknown fixture mode: {mode}")
+        self.archive = archive
+        self.mode = mode
+        self.http = HTTPAdapter() if mode == 'record' else None
+
+    def send(self, request:requests.PreparedRequest, **kwargs) -> requests.Response:
+        if self.mode == 'record':
+            for header in _CONDITIONAL_HEADERS:
+                request.headers.pop(header, None)
+            resp = self.http.send(request, **kwargs)
+            resp.content  # Read the body before saving it
+            if 200 <= resp.status_code < 300 or resp.status_code in _REDIRECT_STATUSES:
+                self.archive.save(request.url, resp)
+            return resp
+
+        recorded = self.archive.get(request.url)
+        if recorded is None:
+            raise requests.ConnectionError(f"No fixture recorded for {request.url}", request=request)
+        meta, body = recorded
+        resp = requests.Response()
+        resp.status_code = meta['status']
+        resp.reason = meta['reason']
+        resp.headers = CaseInsensitiveDict(meta['headers'])
+        resp.encoding = meta['encoding']
+        resp._content = body
+        resp.url = request.url
+        resp.request = request
+        resp.connection = self
+        return resp
+
+    def close(self) -> None:
+        if self.http is not None:
+            self.http.close()
+
+
+class StandInServer(ThreadingHTTPServer):
+    """Local http server answering with the pages of a fixture archive.
+
+    Pages are looked up by path and query, the host is ignored, so the
+    crawlers only need their base urls pointed here. Every response waits
+    `latency` plus up to `jitter` seconds. With probability `error_rate`
+    it answers `error_status` instead, with `drop_rate` it closes the
+    connection without answering. Conditional requests get a 304 when the
+    ETag matches.
+    """
+    daemon_threads = True
+
+    def __init__(self, archive:FixtureArchive, host:str = '127.0.0.1', port:int = 8765,
+                 latency:float = 0.0, jitter:float = 0.0, error_rate:float = 0.0,
+                 error_status:int = 503, drop_rate:float = 0.0, seed:int|None = None):
+        self.archive = archive
+        self.routes = archive.pages()
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.drop_rate = drop_rate
+        self.random = random.Random(seed)
+        self.random_lock = threading.Lock()
+        self.stats = {'served': 0, 'not_modified': 0, 'errors': 0, 'dropped': 0, 'missing': 0}
+        super().__init__((host, port), _StandInHandler)
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def roll(self) -> float:
+        with self.random_lock:
+            return self.random.random()
+
+    def count(self, name:str) -> None:
+        with self.random_lock:
+            self.stats[name] += 1
+
+
+class _StandInHandler(BaseHTTPRequestHandler):
+    server:StandInServer
+
+    def log_message(self, format, *args) -> None:
+        pass  # Load tests would flood the console
+
+    def do_GET(self) -> None:
+        server = self.server
+        delay = server.latency + (server.roll() * server.jitter if server.jitter else 0)
+        if delay:
+            time.sleep(delay)
+
+        if server.drop_rate and server.roll() < server.drop_rate:
+            server.count('dropped')
+            self.close_connection = True
+            self.connection.close()
+            return
+        if server.error_rate and server.roll() < server.error_rate:
+            server.count('errors')
+            self.send_error(server.error_status, "Injected error")
+            return
+
+        url = server.routes.get(self.path)
+        recorded = server.archive.get(url) if url is not None else None
+        if recorded is None:
+            server.count('missing')
+            self.send_error(404, "Not recorded")
+            return
+        meta, body = recorded
+
+        headers = CaseInsensitiveDict(meta['headers'])
+        etag = headers.get('ETag') or f'"{hashlib.sha1(body).hexdigest()}"'
+        if self.headers.get('If-None-Match') == etag:
+            server.count('not_modified')
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+
+        server.count('served')
+        self.send_response(meta['status'], meta['reason'])
+        for key, value in headers.items():
+            if key.lower() not in ('etag', 'date', 'server'):
+                self.send_header(key, value)
+        self.send_header('ETag', etag)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def main(argv:list[str]|None = None) -> None:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Crawler fixtures")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    serve_parser = subparsers.add_parser('serve', help="serve a fixture archive as a local stand-in server")
+    serve_parser.add_argument('archive')
+    serve_parser.add_argument('--host', default='127.0.0.1')
+    serve_parser.add_argument('--port', type=int, default=8765)
+    serve_parser.add_argument('--latency', type=float, default=0.0, help="seconds added to every response")
+    serve_parser.add_argument('--jitter', type=float, default=0.0, help="max random seconds added on top")
+    serve_parser.add_argument('--error-rate', type=float, default=0.0, help="share of requests answered with an error")
+    serve_parser.add_argument('--error-status', type=int, default=503)
+    serve_parser.add_argument('--drop-rate', type=float, default=0.0, help="share of connections closed without answer")
+    serve_parser.add_argument('--seed', type=int, default=None)
+
+    list_parser = subparsers.add_parser('list', help="list the recorded urls of an archive")
+    list_parser.add_argument('archive')
+
+    args = parser.parse_args(argv)
+    archive = FixtureArchive(args.archive)
+
+    if args.command == 'list':
+        for url, meta in archive.index.items():
+            print(f"{meta['status']} {url}")
+        return
+
+    server = StandInServer(archive, args.host, args.port, args.latency, args.jitter,
+                           args.error_rate, args.error_status, args.drop_rate, args.seed)
+    print(f"Serving {len(archive)} recorded pages on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"Stats: {server.stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,369 @@
+# !/.venv/Scripts python3
+# -*- coding: utf-8 -*-
+
+"""Game engine for Rhythm Game Music guessing game.
+
+Every song of the store is turned into one row of a NumPy feature matrix
+when the engine is built (and again when crawled info is merged into the
+store). The feedback of every guess against every target is precomputed
+from it, answering a guess is then a single table lookup.
+
+Author:      Imyuru_ (Imyuru_H)
+Version:     0.1.0
+Update Time: 25/06/25
+"""
+
+""" Update Logs:
+ - 0.0.1:
+     - Create this module, add the song feature matrix, column feedback and game sessions.
+ - 0.0.2:
+     - Keep the games in the sharded `session.SessionStore`.
+ - 0.0.3:
+     - Add the daily song, answered from a precomputed songs x songs feedback table.
+ - 0.0.4:
+     - Add hints: narrow the candidates with the past feedback, suggest the guess with the most information.
+ - 0.0.5:
+     - Record guesses atomically in the session store.
+     - Rebuild the feature matrix and feedback tables when crawled info is merged into the store.
+ - 0.0.6:
+     - `best_guesses` returns at least one guess for any `k`.
+ - 0.0.7:
+     - Answer every guess from the feedback table, drop the duplicate `compare`.
+ - 0.0.8:
+     - Read the guessed songs of a session from its bitset.
+ - 0.0.9:
+     - A merged song only updates its own feature row and its row and column of the feedback tables.
+     - Feedback ids are packed from the feedback itself instead of numbered with `np.unique`.
+ - 0.1.0:
+     - `share` moves the feature and feedback tables into shared memory for the pre-forked workers.
+"""
+
+__version__ = '0.1.0'
+__author__ = 'Imyuru_'
+
+# Copyright (c) 2025 Imyuru_. Licensed under MIT License.
+
+import re
+import mmap
+import random
+import hashlib
+import datetime
+import threading
+import multiprocessing
+
+import numpy as np
+
+from songstore import DIFFICULTIES, SongStore
+from session import SessionStore
+
+
+_NUMBER_PATTERN = re.compile(r"\d+(?:\.\d+)?")
+
+# Columns of the feature matrix
+BPM = 0
+LEVELS = slice(1, 1 + len(DIFFICULTIES))  # Chart constants of EZ, HD, IN, AT
+HAS_AT = 1 + len(DIFFICULTIES)
+PACK = HAS_AT + 1
+ARTIST = PACK + 1
+FEATURES = ARTIST + 1
+
+# Columns of the feedback table, levels are stored in tenths
+FB_CORRECT = 0
+FB_BPM = 1
+FB_LEVELS = slice(2, 2 + len(DIFFICULTIES))
+FB_AT = FB_LEVELS.stop
+FB_PACK = FB_AT + 1
+FB_ARTIST = FB_PACK + 1
+FB_COLUMNS = FB_ARTIST + 1
+FB_UNKNOWN = np.iinfo(np.int16).min  # A side of the comparison has no value
+
+# Bits of each feedback column in a packed feedback id, see `feedback_keys`
+_KEY_BITS = np.array([1, 2] + [9] * len(DIFFICULTIES) + [1, 1, 1])
+_KEY_SHIFTS = np.concatenate(([0], np.cumsum(_KEY_BITS)[:-1]))
+FEEDBACK_KINDS = 1 << int(_KEY_BITS.sum())  # Every feedback id is below it
+
+DAILY_SALT = 'musicguess-daily'
+
+
+def parse_bpm(bpm:str) -> float:
+    """Highest bpm of '150', '174.59' or a range like '135-175', NaN if unknown"""
+    numbers = _NUMBER_PATTERN.findall(str(bpm))
+    return max(float(number) for number in numbers) if numbers else np.nan
+
+
+def parse_level(level:str) -> float:
+    """Chart constant of a level like '12 (12.6)', the level itself when there is none"""
+    numbers = _NUMBER_PATTERN.findall(str(level))
+    return float(numbers[-1]) if numbers else np.nan
+
+
+def _category_code(value:str) -> float:
+    """Code of a pack or artist, the same in every process and whatever the other songs are"""
+    return float(int.from_bytes(hashlib.sha1(str(value).encode()).digest()[:6], 'big'))  # Exact in a float64
+
+
+def shared_array(array:np.ndarray) -> np.ndarray:
+    """Copy of an array in anonymous shared memory, processes forked after it use the same pages"""
+    buffer = mmap.mmap(-1, max(array.nbytes, 1))
+    shared = np.frombuffer(buffer, dtype=array.dtype, count=array.size).reshape(array.shape)
+    shared[...] = array
+    return shared
+
+
+def build_feedback_table(features:np.ndarray, guesses:np.ndarray|None = None,
+                         targets:np.ndarray|None = None) -> np.ndarray:
+    """Feedback of the guesses against the targets, `table[guess, target]`.
+
+    Every song by default, pass indexes to build a few rows or columns.
+    int16 because level deltas in tenths don't fit int8, the full table of
+    269 songs takes about 1.3 MB.
+    """
+    guesses = np.arange(len(features)) if guesses is None else np.asarray(guesses)
+    targets = np.arange(len(features)) if targets is None else np.asarray(targets)
+    delta = features[targets][None, :, :] - features[guesses][:, None, :]  # [guess, target] = target - guess
+    unknown = np.isnan(delta)
+
+    table = np.zeros((len(guesses), len(targets), FB_COLUMNS), dtype=np.int16)
+    table[:, :, FB_CORRECT] = guesses[:, None] == targets[None, :]
+    table[:, :, FB_BPM] = np.where(unknown[:, :, BPM], FB_UNKNOWN, np.sign(np.nan_to_num(delta[:, :, BPM])))
+    table[:, :, FB_LEVELS] = np.where(unknown[:, :, LEVELS], FB_UNKNOWN,
+                                      np.rint(np.nan_to_num(delta[:, :, LEVELS]) * 10))
+    for column, feature in ((FB_AT, HAS_AT), (FB_PACK, PACK), (FB_ARTIST, ARTIST)):
+        table[:, :, column] = delta[:, :, feature] == 0
+    return table
+
+
+def decode_feedback(row:np.ndarray) -> dict:
+    """One `build_feedback_table` entry as the dict sent to the client"""
+    bpm = int(row[FB_BPM])
+    return {
+        'correct' : bool(row[FB_CORRECT]),
+        'bpm' : None if bpm == FB_UNKNOWN else ('higher', 'lower', 'equal')[(bpm < 0) + 2 * (bpm == 0)],
+        'level' : [None if level == FB_UNKNOWN else int(level) / 10 for level in row[FB_LEVELS]],
+        'at' : bool(row[FB_AT]),
+        'pack' : bool(row[FB_PACK]),
+        'artist' : bool(row[FB_ARTIST]),
+    }
+
+
+def feedback_keys(table:np.ndarray) -> np.ndarray:
+    """Id of every feedback entry, equal entries have equal ids below `FEEDBACK_KINDS`.
+
+    The columns are packed into the bits of one int64, so the ids of a few
+    entries are computed without the rest of the table. Unknown values are
+    0, level deltas over 25.5 (never seen on real charts) are clipped.
+    """
+    fields = table.astype(np.int64)
+    unknown = fields == FB_UNKNOWN
+    fields[..., FB_BPM] += 1  # -1, 0, 1 -> 0, 1, 2
+    fields[..., FB_LEVELS] = np.clip(fields[..., FB_LEVELS], -255, 255) + 256
+    fields[unknown] = 0
+    fields[..., FB_BPM][unknown[..., FB_BPM]] = 3
+    return (fields << _KEY_SHIFTS).sum(axis=-1)
+
+
+def partition_entropy(keys:np.ndarray, kinds:int) -> np.ndarray:
+    """Entropy (bits) of the partition each row of `keys` makes of its columns.
+
+    Rows are guesses, columns the remaining candidates. The feedback ids of
+    row i are shifted by `i * kinds` so one `np.unique` counts the buckets
+    of every row at once.
+    """
+    rows, size = keys.shape
+    shifted = keys.astype(np.int64) + np.arange(rows, dtype=np.int64)[:, None] * kinds
+    buckets, counts = np.unique(shifted, return_counts=True)
+    p = counts / size
+    return np.bincount(buckets // kinds, weights=-p * np.log2(p), minlength=rows)
+
+
+class GameEngine:
+    """Feature matrix of a song store plus the running games.
+
+    Categorical columns (pack, artist) hold integer codes so they are
+    compared like the numeric ones, unknown numbers are NaN. A feature row
+    only depends on its own song.
+
+    `tables_version` counts the updates of the tables, it tells a process
+    its decoded daily column is out of date.
+    """
+    def __init__(self, store:SongStore, sessions:SessionStore|None = None):
+        self.store = store
+        self.titles:list[str] = list(store.songs)
+        self.index:dict[str, int] = {title: i for i, title in enumerate(self.titles)}
+        self._build_lock = threading.Lock()
+        self._daily_lock = threading.Lock()
+        self._daily:tuple[datetime.date, int, list[dict], int]|None = None
+        self.shared = False
+        self.tables_version = np.zeros(1, dtype=np.int64)
+        self.rebuild()
+        store.add_merge_listener(self.update_song)
+
+        self.sessions = sessions if sessions is not None else SessionStore(len(self.titles))
+
+    @staticmethod
+    def song_features(song:dict) -> np.ndarray:
+        """Feature row of one song"""
+        row = np.full(FEATURES, np.nan)
+        row[BPM] = parse_bpm(song['bpm'])
+        for difficulty, level in zip(song['difficulty'], song['level']):
+            row[1 + DIFFICULTIES.index(difficulty)] = parse_level(level)
+        row[HAS_AT] = 'AT' in song['difficulty']
+        row[PACK] = _category_code(song['pack'])
+        row[ARTIST] = _category_code(song['artist'])
+        return row
+
+    def rebuild(self) -> None:
+        """Build the feature matrix and the feedback tables from the store again"""
+        features = np.array([self.song_features(self.store.songs[title]) for title in self.titles])
+        feedback = build_feedback_table(features)
+        keys = feedback_keys(feedback)
+        with self._build_lock:
+            if self.shared:  # Keep the shared pages, the workers map them
+                self.features[...], self.feedback[...], self.feedback_keys[...] = features, feedback, keys
+            else:
+                self.features, self.feedback, self.feedback_keys = features, feedback, keys
+            self.tables_version[0] += 1
+
+    def share(self) -> None:
+        """Move the tables into memory shared with the processes forked afterwards.
+
+        Call it in the parent before forking. The workers then read the same
+        pages instead of each keeping a copy, and a song merged in any worker
+        updates the tables of all of them. The build lock becomes a process
+        lock for that.
+        """
+        with self._build_lock:
+            self.features = shared_array(self.features)
+            self.feedback = shared_array(self.feedback)
+            self.feedback_keys = shared_array(self.feedback_keys)
+            self.tables_version = shared_array(self.tables_version)
+            self.shared = True
+        self._build_lock = multiprocessing.Lock()
+
+    def update_song(self, title:str) -> bool:
+        """Refresh the features of a song after crawled info was merged into it.
+
+        Only its feature row and its row and column of the feedback tables
+        are written, in place, and nothing at all when none of its features
+        changed (like a merge only adding the note counts). Returns whether
+        the tables changed.
+        """
+        i = self.index.get(title)
+        if i is None:
+            return False
+        row = self.song_features(self.store.songs[title])
+        with self._build_lock:
+            if np.array_equal(row, self.features[i], equal_nan=True):
+                return False
+            self.features[i] = row
+            as_guess = build_feedback_table(self.features, guesses=[i])[0]
+            as_target = build_feedback_table(self.features, targets=[i])[:, 0]
+            self.feedback[i] = as_guess
+            self.feedback[:, i] = as_target
+            self.feedback_keys[i] = feedback_keys(as_guess)
+            self.feedback_keys[:, i] = feedback_keys(as_target)
+            self.tables_version[0] += 1
+        return True
+
+    def __len__(self) -> int:
+        return len(self.titles)
+
+    def feedback_of(self, guess:int, target:int) -> dict:
+        """Column feedback of a guess, numbers say where the target is from the guess"""
+        daily = self._daily
+        if daily is not None and daily[1] == target and daily[3] == self.tables_version[0]:
+            return daily[2][guess]  # The column of the daily song is decoded already
+        return decode_feedback(self.feedback[guess, target])
+
+    def start(self, target:str|None = None) -> str:
+        """Start a game, a random target is picked when none is given"""
+        index = self.index[target] if target is not None else random.randrange(len(self.titles))
+        return self.sessions.create(index).id
+
+    def guess(self, session:str, title:str) -> dict|None:
+        """Feedback of a guess, None for an unknown session or song.
+
+        The game ends once the target is guessed.
+        """
+        guess = self.index.get(title)
+        if guess is None:
+            return None
+        recorded = self.sessions.record_guess(session, guess)
+        if recorded is None:
+            return None
+        target, guesses = recorded
+        return {**self.feedback_of(guess, target), 'guesses': guesses}
+
+    def daily_target(self, date:datetime.date|None = None) -> int:
+        """Song of the day, the same in every process and after restarts"""
+        date = date or datetime.date.today()
+        digest = hashlib.sha256(f"{DAILY_SALT}:{date.isoformat()}".encode()).digest()
+        return int.from_bytes(digest[:8], 'big') % len(self.titles)
+
+    def daily(self, date:datetime.date|None = None) -> tuple[int, list[dict]]:
+        """Target of the day and the feedback of every possible guess against it"""
+        date = date or datetime.date.today()
+        daily = self._daily
+        if daily is None or daily[0] != date or daily[3] != self.tables_version[0]:
+            with self._daily_lock:
+                daily = self._daily
+                version = int(self.tables_version[0])
+                if daily is None or daily[0] != date or daily[3] != version:
+                    target = self.daily_target(date)
+                    # One column of the table, decoded once for the whole day
+                    column = [decode_feedback(row) for row in self.feedback[:, target]]
+                    daily = self._daily = (date, target, column, version)
+        return daily[1], daily[2]
+
+    def daily_guess(self, title:str, date:datetime.date|None = None) -> dict|None:
+        """Feedback of a guess at the daily song, None for an unknown song"""
+        guess = self.index.get(title)
+        if guess is None:
+            return None
+        return self.daily(date)[1][guess]
+
+    def candidates(self, guesses:list[int]|np.ndarray, target:int) -> np.ndarray:
+        """Indexes of the songs giving the same feedback to every guess as the target"""
+        mask = np.ones(len(self.titles), dtype=bool)
+        if len(guesses):
+            keys = self.feedback_keys[guesses]  # guesses x songs
+            mask &= (keys == keys[:, target:target+1]).all(axis=0)
+        return np.flatnonzero(mask)
+
+    def best_guesses(self, candidates:np.ndarray, k:int = 3) -> list[tuple[int, float]]:
+        """Guesses splitting the candidates the most, as (index, expected bits).
+
+        Every song is scored as a guess at once on a songs x candidates
+        slice of the feedback ids. A candidate wins ties since it may be
+        the answer.
+        """
+        k = max(1, k)
+        if len(candidates) <= 1:
+            return [(int(i), 0.0) for i in candidates]
+        gain = partition_entropy(self.feedback_keys[:, candidates], FEEDBACK_KINDS)
+        score = gain.copy()
+        score[candidates] += 1e-6
+        best = np.argpartition(-score, k)[:k] if k < len(score) else np.arange(len(score))
+        best = best[np.argsort(-score[best])]
+        return [(int(i), float(gain[i])) for i in best]
+
+    def hint(self, guesses:list[int]|np.ndarray, target:int, k:int = 3) -> dict:
+        candidates = self.candidates(guesses, target)
+        return {
+            'candidates' : len(candidates),
+            'bits' : float(np.log2(len(candidates))) if len(candidates) else 0.0,
+            'best' : [{'title': self.titles[i], 'bits': round(bits, 3)} for i, bits in self.best_guesses(candidates, k)],
+        }
+
+    def session_hint(self, session:str, k:int = 3) -> dict|None:
+        """Hint for a running game, None for an unknown session"""
+        game = self.sessions.get(session)
+        if game is None:
+            return None
+        # Indexes of the set bits of the guessed songs bitset
+        guessed = np.flatnonzero(np.unpackbits(np.frombuffer(game.history, dtype=np.uint8), bitorder='little'))
+        return self.hint(guessed, game.target, k)
+
+    def target(self, session:str) -> str|None:
+        game = self.sessions.get(session)
+        return None if game is None else self.titles[game.target]
@@ -0,0 +1,193 @@
+# !/.venv/Scripts python3
+# -*- coding: utf-8 -*-
+
+"""Request stage timing and Prometheus metrics for Rhythm Game Music guessing game.
+
+Author:      Imyuru_ (Imyuru_H)
+Version:     0.0.2
+Update Time: 25/06/17
+"""
+
+""" Update Logs:
+ - 0.0.1:
+     - Create this module, add stage timers, counters and histograms with quantiles.
+ - 0.0.2:
+     - Add gauges.
+"""
+
+__version__ = '0.0.2'
+__author__ = 'Imyuru_'
+
+# Copyright (c) 2025 Imyuru_. Licensed under MIT License.
+
+import time
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+
+
+# Upper bounds (seconds) of the latency buckets, +Inf is implied
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                   0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class StageTimer:
+    """Wall time of the named stages of one request.
+
+    Stages timed more than once add up, the order they first ran is kept.
+    """
+    __slots__ = ('start', 'stages')
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.stages:dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name:str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def add(self, name:str, seconds:float) -> None:
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def total(self) -> float:
+        return time.perf_counter() - self.start
+
+    def header(self) -> str:
+        """`Server-Timing` header value, durations in milliseconds"""
+        return ', '.join([f"{name};dur={seconds*1000:.3f}" for name, seconds in self.stages.items()]
+                         + [f"total;dur={self.total()*1000:.3f}"])
+
+
+class Histogram:
+    """Fixed bucket histogram, quantiles are interpolated inside the buckets"""
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets:tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Last one is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value:float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q:float) -> float:
+        if not self.count:
+            return float('nan')
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            if seen + count >= rank and count:
+                if i == len(self.buckets):
+                    return self.buckets[-1]  # Nothing better to say about +Inf
+                lower = self.buckets[i-1] if i else 0.0
+                return lower + (self.buckets[i] - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+
+def _labels(labels:dict|None) -> tuple:
+    return tuple(sorted(labels.items())) if labels else ()
+
+def _format_labels(labels:tuple, *extra:tuple[str, str]) -> str:
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    escaped = [(key, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+               for key, value in pairs]
+    return '{' + ','.join(f'{key}="{value}"' for key, value in escaped) + '}'
+
+def _format_value(value:float) -> str:
+    if value != value:
+        return 'NaN'
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Metrics:
+    """Thread-safe counters, gauges and histograms rendered in Prometheus text format"""
+    def __init__(self, namespace:str = 'musicguess'):
+        self.namespace = namespace
+        self.lock = threading.Lock()
+        self.help:dict[str, str] = {}
+        self.counters:dict[str, dict[tuple, float]] = {}
+        self.gauges:dict[str, dict[tuple, float]] = {}
+        self.histograms:dict[str, dict[tuple, Histogram]] = {}
+
+    def describe(self, name:str, text:str) -> None:
+        self.help[name] = text
+
+    def inc(self, name:str, labels:dict|None = None, value:float = 1) -> None:
+        key = _labels(labels)
+        with self.lock:
+            series = self.counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def set_gauge(self, name:str, value:float, labels:dict|None = None) -> None:
+        key = _labels(labels)
+        with self.lock:
+            self.gauges.setdefault(name, {})[key] = value
+
+    def observe(self, name:str, value:float, labels:dict|None = None) -> None:
+        key = _labels(labels)
+        with self.lock:
+            series = self.histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram()
+            histogram.observe(value)
+
+    def observe_timer(self, timer:StageTimer, labels:dict|None = None) -> None:
+        """Record every stage and the total of one request"""
+        labels = labels or {}
+        for stage, seconds in timer.stages.items():
+            self.observe('stage_duration_seconds', seconds, {**labels, 'stage': stage})
+        self.observe('request_duration_seconds', timer.total(), labels)
+
+    def render(self) -> str:
+        lines = []
+        with self.lock:
+            for kind, metrics in (('counter', self.counters), ('gauge', self.gauges)):
+                for name, series in sorted(metrics.items()):
+                    full_name = f"{self.namespace}_{name}"
+                    if name in self.help:
+                        lines.append(f"# HELP {full_name} {self.help[name]}")
+                    lines.append(f"# TYPE {full_name} {kind}")
+                    for labels, value in sorted(series.items()):
+                        lines.append(f"{full_name}{_format_labels(labels)} {_format_value(value)}")
+
+            for name, series in sorted(self.histograms.items()):
+                full_name = f"{self.namespace}_{name}"
+                if name in self.help:
+                    lines.append(f"# HELP {full_name} {self.help[name]}")
+                lines.append(f"# TYPE {full_name} histogram")
+                for labels, histogram in sorted(series.items()):
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets + (float('inf'),), histogram.counts):
+                        cumulative += count
+                        le = '+Inf' if bound == float('inf') else repr(bound)
+                        lines.append(f"{full_name}_bucket{_format_labels(labels, ('le', le))} {cumulative}")
+                    lines.append(f"{full_name}_sum{_format_labels(labels)} {_format_value(histogram.sum)}")
+                    lines.append(f"{full_name}_count{_format_labels(labels)} {histogram.count}")
+
+                # Quantiles estimated from the buckets, as a gauge next to the histogram
+                lines.append(f"# HELP {full_name}_quantile p50/p95/p99 of {full_name} estimated from its buckets")
+                lines.append(f"# TYPE {full_name}_quantile gauge")
+                for labels, histogram in sorted(series.items()):
+                    for q in QUANTILES:
+                        lines.append(f"{full_name}_quantile{_format_labels(labels, ('quantile', str(q)))} "
+                                     f"{_format_value(histogram.quantile(q))}")
+        return '\n'.join(lines) + '\n'
+
+
+# Shared registry of the app
+METRICS = Metrics()
+METRICS.describe('requests_total', "Handled http requests")
+METRICS.describe('request_duration_seconds', "Wall time of a request, logging included")
+METRICS.describe('stage_duration_seconds', "Wall time of each stage of a request")
@@ -0,0 +1,135 @@
+# !/.venv/Scripts python3
+# -*- coding: utf-8 -*-
+
+"""Pre-fork multi-process server for Rhythm Game Music guessing game.
+
+The parent loads the app once, opens the listening socket and forks the
+workers. The song store and alias index start out as copy-on-write pages
+shared with the parent. They don't stay fully shared: CPython writes the
+reference count of every object it touches, so the pages holding objects
+a worker reads get copied over time. `gc.freeze()` only keeps the garbage
+collector from dirtying the rest on its scans. The NumPy tables of the
+game engine hold no Python objects, the parent moves them into shared
+memory (`GameEngine.share`) so every worker reads the same pages.
+Each worker runs a threaded Werkzeug server on the inherited socket, the
+kernel spreads the connections over the workers.
+
+Everything else is per worker: the metrics at `/metrics` (session gauges
+included) only cover the worker that answered, and crawled info merged
+by one worker only reaches the others through the shared game tables,
+not their song rows.
+
+Author:      Imyuru_ (Imyuru_H)
+Version:     0.0.3
+Update Time: 25/06/25
+"""
+
+""" Update Logs:
+ - 0.0.1:
+     - Create this module, serve the app from forked workers sharing one socket.
+ - 0.0.2:
+     - Correct what the workers really share with the parent.
+ - 0.0.3:
+     - Document the game tables shared through `GameEngine.share`.
+"""
+
+__version__ = '0.0.3'
+__author__ = 'Imyuru_'
+
+# Copyright (c) 2025 Imyuru_. Licensed under MIT License.
+
+import os
+import gc
+import time
+import signal
+import socket
+
+from werkzeug.serving import make_server
+
+
+def can_fork() -> bool:
+    """Pre-forking needs POSIX fork (not on Windows)"""
+    return hasattr(os, 'fork')
+
+
+def serve(app, host:str, port:int, workers:int, on_child=None, log=print) -> None:
+    """Serve `app` from `workers` forked processes until SIGINT/SIGTERM.
+
+    Dead workers are forked again. Without fork, a single threaded server
+    is run instead.
+
+    Args:
+        app: WSGI app, loaded before this is called
+        host: listening host
+        port: listening port
+        workers: number of worker processes
+        on_child: called as `on_child(n)` in a new worker before it serves
+        log: called with progress messages
+    """
+    if not can_fork() or workers <= 1:
+        if workers > 1:
+            log("Fork is not available on this platform, serving from one process.")
+        make_server(host, port, app, threaded=True).serve_forever()
+        return
+
+    listener = socket.create_server((host, port), backlog=1024)
+    listener.set_inheritable(True)
+
+    # Whatever is alive now is shared, keep the gc from dirtying those pages
+    gc.collect()
+    gc.freeze()
+
+    children:dict[int, int] = {}  # pid -> worker number
+    stopping = False
+
+    def _spawn(n:int) -> None:
+        pid = os.fork()
+        if pid:
+            children[pid] = n
+            return
+        # Worker process
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        code = 0
+        try:
+            if on_child is not None:
+                on_child(n)
+            make_server(host, port, app, threaded=True, fd=listener.fileno()).serve_forever()
+        except BaseException as e:
+            log(f"Worker {n} stopped: {type(e).__name__} {str(e)}")
+            code = 1
+        finally:
+            os._exit(code)
+
+    def _stop(signum, frame) -> None:
+        nonlocal stopping
+        stopping = True
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, _stop)
+    signal.signal(signal.SIGTERM, _stop)
+
+    for n in range(workers):
+        _spawn(n)
+    log(f"Serving on http://{host}:{port} with {workers} workers: {list(children)}")
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        n = children.pop(pid, None)
+        if n is None or stopping:
+            continue
+        log(f"Worker {n} (pid {pid}) exited with {os.waitstatus_to_exitcode(status)}, restarting.")
+        time.sleep(0.5)  # Don't spin if workers die at start
+        _spawn(n)
+
+    listener.close()
+    log("All workers stopped.")
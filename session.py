@@ -0,0 +1,350 @@
+# !/.venv/Scripts python3
+# -*- coding: utf-8 -*-
+
+"""Game session store for Rhythm Game Music guessing game.
+
+Author:      Imyuru_ (Imyuru_H)
+Version:     0.0.6
+Update Time: 25/06/25
+"""
+
+""" Update Logs:
+ - 0.0.1:
+     - Create this module, add sharded sessions with TTL/LRU eviction and a memory cap.
+ - 0.0.2:
+     - Signed session ids, so a worker process can pick up a game another worker started.
+ - 0.0.3:
+     - Sessions remember the songs guessed so far.
+ - 0.0.4:
+     - Add `record_guess`, updating a session under its shard lock.
+ - 0.0.5:
+     - Drop the signed session ids, they exposed the target and brought back finished or expired games.
+     - Add `SharedSessionStore`, a SQLite session store shared by the pre-forked workers.
+ - 0.0.6:
+     - Keep the guessed songs as a fixed size bitset, counted in the session memory.
+"""
+
+__version__ = '0.0.6'
+__author__ = 'Imyuru_'
+
+# Copyright (c) 2025 Imyuru_. Licensed under MIT License.
+
+import os
+import sys
+import time
+import sqlite3
+import secrets
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+
+def history_bytes(songs:int) -> int:
+    """Size of the guessed songs bitset of a game"""
+    return (songs + 7) // 8
+
+
+class GameSession:
+    """One running game, kept small since there can be tens of thousands"""
+    __slots__ = ('id', 'target', 'guesses', 'history', 'created', 'last_seen')
+
+    def __init__(self, id:str, target:int, songs:int):
+        self.id = id
+        self.target = target
+        self.guesses = 0
+        # Bit i is set once song i was guessed, the size never grows with the guesses
+        self.history = bytearray(history_bytes(songs))
+        self.created = self.last_seen = time.monotonic()
+
+    def remember(self, guess:int) -> None:
+        self.history[guess >> 3] |= 1 << (guess & 7)
+
+
+def _session_bytes(songs:int) -> int:
+    """Rough memory of one session: record, its id, history and the shard entry"""
+    session = GameSession(secrets.token_urlsafe(16), 0, songs)
+    entry = sys.getsizeof(OrderedDict.fromkeys(range(1000))) // 1000  # OrderedDict slot + node
+    return (sys.getsizeof(session) + sys.getsizeof(session.id) + sys.getsizeof(session.history)
+            + sys.getsizeof(session.created) * 2 + entry)
+
+
+class _Shard:
+    __slots__ = ('lock', 'sessions')
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # Least recently used first, touching a session moves it to the end
+        self.sessions:OrderedDict[str, GameSession] = OrderedDict()
+
+
+class SessionStore:
+    """Sessions spread over independently locked shards.
+
+    A session expires `ttl` seconds after it was last used. Each shard keeps
+    its sessions in LRU order, so expired ones are always at its front and
+    are dropped while creating new ones. When the store is full the least
+    recently used session of the shard is evicted, which bounds the memory
+    by `max_sessions` (itself capped by `max_bytes`). A session remembers
+    which of the `songs` were guessed in a bitset, so its size is fixed.
+
+    The sessions live in one process, forked workers use `SharedSessionStore`.
+    """
+    def __init__(self, songs:int, shards:int = 16, ttl:float = 1800, max_sessions:int = 100000,
+                 max_bytes:int = 64 * 1024**2):
+        self.songs = songs
+        self.ttl = ttl
+        self.session_bytes = _session_bytes(songs)
+        self.max_sessions = max(shards, min(max_sessions, max_bytes // self.session_bytes))
+        self.shard_limit = self.max_sessions // shards
+        self.shards = [_Shard() for _ in range(shards)]
+
+        # Updated under the shard locks, so they may be a little behind when read
+        self.created = 0
+        self.expired = 0
+        self.evicted = 0
+
+    def _shard(self, id:str) -> _Shard:
+        return self.shards[hash(id) % len(self.shards)]
+
+    def _expire(self, shard:_Shard, now:float) -> None:
+        sessions = shard.sessions
+        while sessions:
+            session = next(iter(sessions.values()))
+            if now - session.last_seen < self.ttl:
+                break
+            sessions.popitem(last=False)
+            self.expired += 1
+
+    def _insert(self, shard:_Shard, session:GameSession) -> None:
+        """Add a session to its shard, the caller holds the shard lock"""
+        self._expire(shard, session.created)
+        while len(shard.sessions) >= self.shard_limit:
+            shard.sessions.popitem(last=False)
+            self.evicted += 1
+        shard.sessions[session.id] = session
+
+    def create(self, target:int) -> GameSession:
+        session = GameSession(secrets.token_urlsafe(16), target, self.songs)
+        shard = self._shard(session.id)
+        with shard.lock:
+            self._insert(shard, session)
+            self.created += 1
+        return session
+
+    def _live(self, shard:_Shard, id:str) -> GameSession|None:
+        """The session if it is alive and mark it used, the caller holds the shard lock"""
+        now = time.monotonic()
+        session = shard.sessions.get(id)
+        if session is None:
+            return None
+        if now - session.last_seen >= self.ttl:
+            del shard.sessions[id]
+            self.expired += 1
+            return None
+        session.last_seen = now
+        shard.sessions.move_to_end(id)
+        return session
+
+    def get(self, id:str) -> GameSession|None:
+        """The session if it is alive, it counts as used"""
+        shard = self._shard(id)
+        with shard.lock:
+            return self._live(shard, id)
+
+    def record_guess(self, id:str, guess:int) -> tuple[int, int]|None:
+        """Add a guess to a live session, returns (target, guesses) or None.
+
+        The session is updated under its shard lock so concurrent guesses
+        are all counted. Guessing the target ends the game.
+        """
+        shard = self._shard(id)
+        with shard.lock:
+            game = self._live(shard, id)
+            if game is None:
+                return None
+            game.guesses += 1
+            game.remember(guess)
+            if guess == game.target:
+                del shard.sessions[id]
+            return game.target, game.guesses
+
+    def remove(self, id:str) -> bool:
+        shard = self._shard(id)
+        with shard.lock:
+            return shard.sessions.pop(id, None) is not None
+
+    def sweep(self) -> None:
+        """Drop the expired sessions of every shard"""
+        now = time.monotonic()
+        for shard in self.shards:
+            with shard.lock:
+                self._expire(shard, now)
+
+    def __len__(self) -> int:
+        return sum(len(shard.sessions) for shard in self.shards)
+
+    def stats(self) -> dict:
+        size = len(self)
+        return {
+            'sessions' : size,
+            'max_sessions' : self.max_sessions,
+            'memory_bytes' : size * self.session_bytes,
+            'created' : self.created,
+            'expired' : self.expired,
+            'evicted' : self.evicted,
+        }
+
+
+class SharedSessionStore:
+    """Sessions in a SQLite file, shared by the pre-forked worker processes.
+
+    Same interface as `SessionStore`. Any worker can answer any guess, the
+    guess count, history, TTL and the end of a game are seen by all of
+    them. Session ids are random tokens, the target never leaves the
+    server. Expired sessions are dropped every `SWEEP_EVERY` creations,
+    over `max_sessions` the least recently used ones are evicted.
+
+    Create it before forking and call `after_fork()` in every worker, a
+    SQLite connection can't cross fork.
+    """
+    SWEEP_EVERY = 256
+
+    def __init__(self, path:str, songs:int, ttl:float = 1800, max_sessions:int = 100000):
+        self.path = path
+        self.songs = songs
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        for suffix in ('', '-wal', '-shm'):  # Games of an earlier run are over
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._connect()
+        with self.lock, self.conn:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS sessions (
+                    id TEXT PRIMARY KEY,
+                    target INTEGER NOT NULL,
+                    guesses INTEGER NOT NULL,
+                    history BLOB NOT NULL,
+                    created REAL NOT NULL,
+                    last_seen REAL NOT NULL
+                )""")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_last_seen ON sessions (last_seen)")
+
+        # Counted by this process only
+        self.created = 0
+        self.expired = 0
+        self.evicted = 0
+
+    def _connect(self) -> None:
+        self.lock = threading.Lock()
+        # Autocommit, transactions are opened explicitly
+        self.conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=5)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=OFF")  # Sessions don't have to survive a crash
+
+    @contextmanager
+    def _transaction(self):
+        """Write transaction of this process, the other workers wait for it"""
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+            self.conn.execute("COMMIT")
+
+    def after_fork(self) -> None:
+        """Call in a forked worker, it needs its own connection"""
+        self._connect()
+        self.created = self.expired = self.evicted = 0
+
+    def _session(self, row:tuple) -> GameSession:
+        id, target, guesses, history, created, last_seen = row
+        session = GameSession(id, target, self.songs)
+        session.guesses = guesses
+        session.history[:] = history
+        session.created, session.last_seen = created, last_seen
+        return session
+
+    def _live(self, id:str, now:float) -> tuple|None:
+        """Row of a live session, marked used; the caller holds a write transaction"""
+        row = self.conn.execute("SELECT * FROM sessions WHERE id = ?", (id,)).fetchone()
+        if row is None:
+            return None
+        if now - row[5] >= self.ttl:
+            self.conn.execute("DELETE FROM sessions WHERE id = ?", (id,))
+            self.expired += 1
+            return None
+        self.conn.execute("UPDATE sessions SET last_seen = ? WHERE id = ?", (now, id))
+        return row[:5] + (now,)
+
+    def create(self, target:int) -> GameSession:
+        session = GameSession(secrets.token_urlsafe(16), target, self.songs)
+        session.created = session.last_seen = time.time()
+        with self._transaction():
+            self.conn.execute("INSERT INTO sessions VALUES (?, ?, 0, ?, ?, ?)",
+                              (session.id, target, session.history, session.created, session.last_seen))
+            self.created += 1
+            if self.created % self.SWEEP_EVERY == 0:
+                self._sweep(session.created)
+        return session
+
+    def get(self, id:str) -> GameSession|None:
+        """The session if it is alive, it counts as used"""
+        with self._transaction():
+            row = self._live(id, time.time())
+        return None if row is None else self._session(row)
+
+    def record_guess(self, id:str, guess:int) -> tuple[int, int]|None:
+        """Add a guess to a live session, returns (target, guesses) or None.
+
+        One write transaction, so guesses sent to several workers at once
+        are all counted. Guessing the target ends the game.
+        """
+        with self._transaction():
+            row = self._live(id, time.time())
+            if row is None:
+                return None
+            game = self._session(row)
+            game.guesses += 1
+            game.remember(guess)
+            if guess == game.target:
+                self.conn.execute("DELETE FROM sessions WHERE id = ?", (id,))
+            else:
+                self.conn.execute("UPDATE sessions SET guesses = ?, history = ? WHERE id = ?",
+                                  (game.guesses, game.history, id))
+        return game.target, game.guesses
+
+    def remove(self, id:str) -> bool:
+        with self.lock:
+            return self.conn.execute("DELETE FROM sessions WHERE id = ?", (id,)).rowcount > 0
+
+    def _sweep(self, now:float) -> None:
+        """Drop the expired sessions, then the least recently used over the cap (transaction held)"""
+        self.expired += self.conn.execute("DELETE FROM sessions WHERE last_seen <= ?", (now - self.ttl,)).rowcount
+        over = self.conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0] - self.max_sessions
+        if over > 0:
+            self.evicted += self.conn.execute(
+                "DELETE FROM sessions WHERE id IN (SELECT id FROM sessions ORDER BY last_seen LIMIT ?)", (over,)
+            ).rowcount
+
+    def sweep(self) -> None:
+        with self._transaction():
+            self._sweep(time.time())
+
+    def __len__(self) -> int:
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+    def stats(self) -> dict:
+        """`sessions` counts every worker, the other numbers this process only"""
+        return {
+            'sessions' : len(self),
+            'max_sessions' : self.max_sessions,
+            'created' : self.created,
+            'expired' : self.expired,
+            'evicted' : self.evicted,
+        }
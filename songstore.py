@@ -0,0 +1,325 @@
+# !/.venv/Scripts python3
+# -*- coding: utf-8 -*-
+
+"""A local song metadata store for Rhythm Game Music guessing game.
+
+The store is loaded once from the quest bank at startup, so a guess can be
+answered without any HTTP round-trip. Crawling is only used to enrich the
+fields the quest bank lacks (note count, missing bpm).
+
+Author:      Imyuru_ (Imyuru_H)
+Version:     0.0.7
+Update Time: 25/06/25
+"""
+
+""" Update Logs:
+ - 0.0.1:
+     - Create this module, load song info from the quest bank.
+ - 0.0.2:
+     - Move quest bank reading here, load the crawled song snapshot.
+ - 0.0.3:
+     - Compile the quest bank into a pickle cache, pandas is only imported to rebuild it.
+ - 0.0.4:
+     - Precompute the result row (JSON and HTML) and the serialized `/submit` response of every song.
+ - 0.0.5:
+     - Add `extend_response` to attach per-request fields to a cached response.
+ - 0.0.6:
+     - Failed or partial enrich crawls are retried with backoff, failures go to the app logger.
+ - 0.0.7:
+     - Add merge listeners, so derived data can follow the crawled updates.
+"""
+
+__version__ = '0.0.7'
+__author__ = 'Imyuru_'
+
+# Copyright (c) 2025 Imyuru_. Licensed under MIT License.
+
+import os
+import math
+import time
+import json
+import pickle
+import hashlib
+import threading
+from html import escape
+from concurrent.futures import ThreadPoolExecutor
+
+
+DIFFICULTIES = ('EZ', 'HD', 'IN', 'AT')
+QUEST_BANK_PATH = os.path.join('static', 'quest_bank', 'quest_phigros.xlsx')
+QUEST_BANK_SHEET = 'quest_phigros'
+SNAPSHOT_PATH = os.path.join('static', 'song_bank', 'snapshot.json')
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache')
+QUEST_CACHE_FORMAT = 1  # Bump when the cached record layout changes
+ENRICH_RETRY_AFTER = 600  # Seconds before a failed or partial enrich crawl is tried again
+ENRICH_RETRY_MAX = 6 * 3600  # The wait doubles after each failure up to this
+
+
+def _file_digest(path:str) -> str:
+    with open(path, 'rb') as f:
+        return hashlib.file_digest(f, 'sha256').hexdigest()
+
+
+def _write_quest_cache(cache_path:str, cache:dict) -> None:
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(cache, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, cache_path)
+
+
+def _read_excel(path:str, sheet_name:str) -> list[dict]:
+    import pandas as pd
+    
+    quest_bank:pd.DataFrame = pd.read_excel(path, sheet_name=sheet_name)
+    # Plain python values only, so the cache can be loaded without pandas
+    return [{key: (None if isinstance(value, float) and math.isnan(value) else value)
+             for key, value in record.items()}
+            for record in quest_bank.to_dict('records')]
+
+
+def read_quest_bank(path:str = QUEST_BANK_PATH, sheet_name:str = QUEST_BANK_SHEET,
+                    cache_dir:str|None = CACHE_DIR) -> list[dict]:
+    """Read the quest bank into one dict per row.
+    
+    The rows are compiled into a pickle under `cache_dir` the first time.
+    Later reads load the pickle as long as the xlsx keeps its mtime and
+    size, or its sha256 when those changed, so pandas is not imported.
+    Pass `cache_dir=None` to always read the xlsx.
+    """
+    if cache_dir is None:
+        return _read_excel(path, sheet_name)
+    
+    cache_path = os.path.join(cache_dir, f"{os.path.splitext(os.path.basename(path))[0]}.{sheet_name}.pickle")
+    stat = os.stat(path)
+    
+    try:
+        with open(cache_path, 'rb') as f:
+            cache = pickle.load(f)
+        if cache['format'] != QUEST_CACHE_FORMAT or cache['sheet'] != sheet_name:
+            cache = None
+    except (OSError, pickle.UnpicklingError, EOFError, KeyError, TypeError):
+        cache = None
+    
+    if cache is not None:
+        if (cache['mtime_ns'], cache['size']) == (stat.st_mtime_ns, stat.st_size):
+            return cache['records']
+        digest = _file_digest(path)
+        if cache['sha256'] == digest:
+            # Only touched, remember the new mtime
+            cache.update(mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+            _write_quest_cache(cache_path, cache)
+            return cache['records']
+    else:
+        digest = _file_digest(path)
+    
+    records = _read_excel(path, sheet_name)
+    _write_quest_cache(cache_path, {
+        'format' : QUEST_CACHE_FORMAT,
+        'sheet' : sheet_name,
+        'mtime_ns' : stat.st_mtime_ns,
+        'size' : stat.st_size,
+        'sha256' : digest,
+        'records' : records,
+    })
+    return records
+
+
+def _cell(value) -> str:
+    """Turn a quest bank cell into a clean string, empty cells become ''"""
+    if value is None:
+        return ''
+    if isinstance(value, float):
+        if math.isnan(value):
+            return ''
+        if value.is_integer():
+            return str(int(value))
+    return str(value).strip()
+
+
+def _dumps(obj) -> bytes:
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def render_row(title:str, song:dict) -> dict:
+    """Compact result row of a guess, what the guess table shows"""
+    return {
+        'title' : title,
+        'artist' : song['artist'],
+        'bpm' : song['bpm'] or '-',
+        'at' : len(song['level']) == 4,
+        'level' : song['level'],
+        'notes' : (song['note count'] or ['-'])[-1],
+        'pack' : song['pack'],
+    }
+
+
+def render_row_html(row:dict) -> str:
+    """The guess table `<tr>` of a row, for clients which still insert html"""
+    levels = ''.join(f"<span>{escape(str(level))}</span>" for level in row['level'])
+    return (f'<tr id="column"><td>{escape(row["title"])}</td><td>{escape(str(row["artist"]))}</td>'
+            f'<td>{escape(str(row["bpm"]))}</td><td>{"✅" if row["at"] else "❌"}</td>'
+            f'<td>{levels}</td><td>{escape(str(row["notes"]))}</td><td>{escape(str(row["pack"]))}</td></tr>')
+
+
+def render_response(title:str, song:dict) -> tuple[bytes, bytes]:
+    """Serialized `/submit` bodies of a song: (JSON row only, JSON row + html)"""
+    row = render_row(title, song)
+    body = {'operation': 'input submit', 'status': True, 'title': [title], 'row': row}
+    return _dumps(body), _dumps({**body, 'html': [render_row_html(row)]})
+
+
+def extend_response(body:bytes, **fields) -> bytes:
+    """Append fields to a serialized JSON object without parsing it again"""
+    if not fields:
+        return body
+    return body[:-1] + b',' + _dumps(fields)[1:]
+
+
+class SongStore:
+    """In-process song info keyed by title.
+
+    Every song is kept in the same dict layout as `crawler.PhiCrawler.run`
+    returns, so the rest of the app doesn't care where the data came from.
+    """
+    def __init__(self, records:list[dict]):
+        self.titles:list[str] = []
+        self.nick_dict:dict[str, list[str]] = {}
+        self.songs:dict[str, dict] = {}
+
+        for record in records:
+            title = _cell(record.get('name'))
+            if not title:
+                continue
+            nicks = [nick for nick in _cell(record.get('nick name')).split(';') if nick]
+
+            difficulty = [d for d in DIFFICULTIES if _cell(record.get(d))]
+            self.titles.append(title)
+            self.nick_dict[title] = [title.lower()] + [nick.lower() for nick in nicks]
+            self.songs[title] = {
+                'pack' : _cell(record.get('chapter')),
+                'difficulty' : difficulty,
+                'level' : [_cell(record.get(d)) for d in difficulty],
+                'note count' : [],
+                'artist' : _cell(record.get('author')),
+                'bpm' : _cell(record.get('bpm')),
+            }
+
+        # Song attributes are static, so the responses are rendered once here
+        self.responses:dict[str, tuple[bytes, bytes]] = {title: render_response(title, song)
+                                                         for title, song in self.songs.items()}
+
+        self._enrich_lock = threading.Lock()
+        self._enrich_pending:set[str] = set()
+        self._enrich_retry:dict[str, tuple[float, float]] = {}  # title -> (retry at, last wait)
+        self._enrich_pool:ThreadPoolExecutor|None = None
+        self._merge_listeners = []
+
+    def __len__(self) -> int:
+        return len(self.songs)
+
+    def __contains__(self, title:str) -> bool:
+        return title in self.songs
+
+    def get(self, title:str) -> dict|None:
+        return self.songs.get(title)
+
+    def response(self, title:str, with_html:bool = False) -> bytes|None:
+        """Pre-serialized `/submit` body of a song, see `render_response`"""
+        bodies = self.responses.get(title)
+        if bodies is None:
+            return None
+        return bodies[1] if with_html else bodies[0]
+
+    def missing_fields(self, title:str) -> list[str]:
+        """Fields of a song which can only be filled by crawling"""
+        song = self.songs[title]
+        return [key for key in ('note count', 'bpm') if not song[key]]
+
+    def add_merge_listener(self, listener) -> None:
+        """`listener(title)` is called after a song was merged, from the merging thread"""
+        self._merge_listeners.append(listener)
+
+    def merge(self, title:str, info:dict) -> None:
+        """Merge crawled info into a song, the quest bank values always win"""
+        song = dict(self.songs[title])
+        for key, value in info.items():
+            if value and not song.get(key):
+                song[key] = value
+        # Swap the whole record so readers never see a half-updated song
+        changed = song != self.songs[title]
+        self.songs[title] = song
+        self.responses[title] = render_response(title, song)
+        if changed:
+            for listener in self._merge_listeners:
+                listener(title)
+
+    def load_snapshot(self, path:str = SNAPSHOT_PATH) -> int:
+        """Merge a crawled snapshot (see `python crawler.py snapshot`) into the store.
+
+        Returns:
+            number of songs found in the snapshot, 0 if there is no snapshot
+        """
+        if not os.path.exists(path):
+            return 0
+        with open(path, encoding='utf-8') as f:
+            snapshot = json.load(f)
+        
+        count = 0
+        for title, info in snapshot['songs'].items():
+            if title in self.songs:
+                self.merge(title, info)
+                count += 1
+        return count
+
+    def enrich_async(self, title:str, crawler, log=print) -> bool:
+        """Crawl the missing fields of a song in the background.
+
+        Each song is crawled at most once at a time, the request thread
+        never waits for it. A crawl which fails or leaves fields missing is
+        not tried again for `ENRICH_RETRY_AFTER` seconds, doubled after
+        every further failure.
+
+        Args:
+            title: song title in the store
+            crawler: a `crawler.PhiCrawler` like object with a `run(song)` method
+            log: called with a message when a crawl fails
+
+        Returns:
+            True if a crawl job was scheduled
+        """
+        if title not in self.songs or not self.missing_fields(title):
+            return False
+
+        with self._enrich_lock:
+            if title in self._enrich_pending:
+                return False
+            retry_at, last_wait = self._enrich_retry.get(title, (0.0, 0.0))
+            if time.monotonic() < retry_at:
+                return False
+            self._enrich_pending.add(title)
+            if self._enrich_pool is None:
+                self._enrich_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='enrich')
+
+        def _job():
+            error = None
+            try:
+                info, _ = crawler.run(title)
+                self.merge(title, info)
+            except Exception as e:
+                error = f"{type(e).__name__} {str(e)}"
+            missing = self.missing_fields(title)
+            with self._enrich_lock:
+                self._enrich_pending.discard(title)
+                if not missing:
+                    self._enrich_retry.pop(title, None)
+                    return
+                wait = min(last_wait * 2, ENRICH_RETRY_MAX) if last_wait else ENRICH_RETRY_AFTER
+                self._enrich_retry[title] = (time.monotonic() + wait, wait)
+            try:
+                log(f"Enrich failed: {title} - {error or f'still missing {missing}'}, retry in {wait:.0f}s")
+            except Exception:
+                pass
+
+        self._enrich_pool.submit(_job)
+        return True
@@ -4,6 +4,74 @@ function handleChoice(choice = 0) {
     document.dispatchEvent(choiceEvent);
 }
 
+let suggestTimer = null
+
+// 输入联想: 停止输入一小段时间后再请求 /suggest
+function suggest() {
+    clearTimeout(suggestTimer);
+    suggestTimer = setTimeout(async () => {
+        const query = document.getElementById('input').value.trim()
+        const list = document.getElementById('suggest-list')
+        if (query === '') {
+            list.replaceChildren();
+            return;
+        }
+
+        try {
+            const response = await fetch(`/suggest?q=${encodeURIComponent(query)}`);
+            if (!response.ok) {
+                throw new Error(`HTTP error! status: ${response.status}`);
+            }
+            const data = await response.json();
+            list.replaceChildren(...data['suggestions'].map(title => {
+                const option = document.createElement('option');
+                option.value = title;
+                return option;
+            }));
+        } catch (error) {
+            console.error('Error:', error);
+        }
+    }, 150);
+}
+
+document.getElementById('input').addEventListener('input', suggest);
+
+const ARROWS = { higher: ' ↑', lower: ' ↓', equal: '' }
+
+// 由 /submit 返回的 JSON 生成一行猜测结果, 有 feedback 时标出与答案的差别
+function renderRow(row, feedback = null) {
+    const tr = document.createElement('tr')
+    tr.id = 'column'
+    const cell = (content) => {
+        const td = document.createElement('td')
+        td.textContent = content
+        tr.appendChild(td)
+        return td
+    }
+    const mark = (element, hit) => {
+        if (feedback) element.classList.add(hit ? 'hit' : 'miss')
+        return element
+    }
+    mark(cell(row['title']), feedback && feedback['correct'])
+    mark(cell(row['artist']), feedback && feedback['artist'])
+    mark(cell(row['bpm'] + (feedback && feedback['bpm'] ? ARROWS[feedback['bpm']] : '')),
+         feedback && feedback['bpm'] === 'equal')
+    mark(cell(row['at'] ? '✅' : '❌'), feedback && feedback['at'])
+    cell('').replaceChildren(...row['level'].map((level, i) => {
+        const span = document.createElement('span')
+        span.textContent = level
+        const delta = feedback ? feedback['level'][i] : null
+        if (delta !== null && delta !== undefined) {
+            span.textContent += delta > 0 ? ' ↑' : delta < 0 ? ' ↓' : ''
+            if (delta === 0) span.classList.add('hit')
+        }
+        return span
+    }))
+    cell(row['notes'])
+    mark(cell(row['pack']), feedback && feedback['pack'])
+    return tr
+}
+
 async function submit(song = null) {
     const input = document.getElementById('input').value
     document.getElementById('input').value = ''
@@ -16,7 +84,7 @@ async function submit(song = null) {
         const response = await fetch('/submit', {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({ title: song || input })
+            body: JSON.stringify({ title: song || input, session: gameSession, daily: dailyMode })
         });
 
         if (!response.ok) {
@@ -27,9 +95,12 @@ async function submit(song = null) {
         console.log('Success:', data);
 
         // 把信息呈现在表格里
-        if (data['status'] && data['title'].length == 1) {
-            table.insertAdjacentHTML('beforeend', data['html'][0]);
-        } else if (data['status'] && data['title'].length > 1) {
+        if (data['status'] && data['title'].length == 1 && !data['fuzzy']) {
+            table.appendChild(renderRow(data['row'], data['feedback']));
+            if (data['feedback'] && data['feedback']['correct']) {
+                alert('猜对了喵~');
+            }
+        } else if (data['status'] && (data['title'].length > 1 || data['fuzzy'])) {
             dialog.querySelectorAll('button').forEach(child => {
                 child.remove();
             });
@@ -41,7 +112,7 @@ async function submit(song = null) {
             document.addEventListener('choiceEvent', (e) => {
                 dialog.style.display = 'none';
                 submit(data['title'][e.detail.index]);
-            });
+            }, { once: true });
         } else if ('error' in data) {
             alert(data['error']);
         }
@@ -1,6 +1,10 @@
+let gameSession = null
+// 每日一曲: 所有人猜同一首歌
+const dailyMode = new URLSearchParams(window.location.search).has('daily')
+
 document.addEventListener("DOMContentLoaded", async function() {
     try {
-        const response = await fetch('/start', {
+        const response = dailyMode ? await fetch('/daily') : await fetch('/start', {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
             body: JSON.stringify({ status:true })
@@ -12,6 +16,10 @@ document.addEventListener("DOMContentLoaded", async function() {
 
         data = await response.json();  // 确保 response 是 JSON
         console.log('Success:', data);
+        gameSession = data['session'] || null;
+        if (dailyMode) {
+            document.getElementById('game-info').textContent = `每日一曲 ${data['date']}`;
+        }
     } catch (error) {
         console.error('Erroe:', error);
     }